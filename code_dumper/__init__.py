@@ -1,7 +1,18 @@
-from .dumper import CodeDumper
+from .async_dumper import AsyncDumper
+from .budget import Budget, CancellationToken, DumpCancelled, DumpTimeout
+from .compiled import CodeCache, CompiledDump
+from .dumper import Bundle, CodeDumper
 from .helpers import format_code, get_name_from_obj, get_source_from_obj
+from .lazy_imports import LazyImportDump
 
-__all__ = ['CodeDumper', 'pretty_print', 'dump']
+__all__ = ['CodeDumper', 'AsyncDumper', 'Bundle', 'CodeCache', 'CompiledDump',
+           'pretty_print', 'dump', 'dump_async', 'dump_many_async',
+           'set_async_executor', 'dump_compiled', 'load_compiled',
+           'dump_bundle', 'dump_lazy', 'LazyImportDump', 'Budget',
+           'CancellationToken', 'DumpCancelled', 'DumpTimeout']
+
+_async_dumper = AsyncDumper()
+_code_cache = CodeCache()
 
 
 def pretty_print(obj, with_source=True, with_vars=True,
@@ -46,7 +57,84 @@ def pretty_print(obj, with_source=True, with_vars=True,
         print()
 
 
-def dump(obj):
+def dump(obj, methods=None, drop_annotations=False, statement_level=False,
+         budget=None):
+    source = get_source_from_obj(obj)
+    name = get_name_from_obj(obj)
+    return CodeDumper(source, drop_annotations=drop_annotations,
+                      statement_level=statement_level,
+                      budget=budget).dump(name, methods, budget)
+
+
+def dump_bundle(objs, methods=None):
+    """
+    Dump several objects from the same module into a single module, with
+    every shared dependency included once.
+    :param objs: The target functions/classes.
+    :param methods: Entry methods to tree-shake class targets with, mapping
+        each class to its list of methods.
+    :return: A Bundle.
+    """
+    sources = {get_source_from_obj(obj) for obj in objs}
+    if len(sources) != 1:
+        raise ValueError("Can only bundle objects from a single module.")
+    names = [get_name_from_obj(obj) for obj in objs]
+    if methods is not None:
+        methods = {get_name_from_obj(obj): m for obj, m in methods.items()}
+    return CodeDumper(sources.pop()).dump_bundle(names, methods)
+
+
+def dump_lazy(obj, methods=None):
+    """
+    Dump `obj`, moving the imports that are only used inside function bodies
+    into those bodies, so that loading the dump doesn't import them.
+    :return: A LazyImportDump.
+    """
+    source = get_source_from_obj(obj)
+    name = get_name_from_obj(obj)
+    return CodeDumper(source).dump_lazy(name, methods)
+
+
+def dump_compiled(obj, methods=None, cache=None):
+    """
+    Dump and compile `obj`. Results are cached by module source and name, so
+    dumping an unchanged object again skips both analysis and compilation.
+    :param cache: The CodeCache to use. Defaults to an in-memory cache.
+    :return: A CompiledDump.
+    """
+    cache = cache or _code_cache
     source = get_source_from_obj(obj)
     name = get_name_from_obj(obj)
-    return CodeDumper(source).dump(name)
+
+    key = CodeCache.make_key(source, name, methods)
+    digest = cache.get_digest(key)
+    compiled = cache.get(digest) if digest else None
+    if compiled is None:
+        compiled = CodeDumper(source).dump_compiled(name, methods, cache)
+        cache.set_digest(key, compiled.digest)
+    return compiled
+
+
+def load_compiled(compiled, cache=None):
+    """
+    Get the code object for a CompiledDump, ready to `exec`. Code objects are
+    cached by content hash, so loading the same dump again is free.
+    :param cache: The CodeCache to use. Defaults to an in-memory cache.
+    """
+    return (cache or _code_cache).load(compiled)
+
+
+def set_async_executor(executor):
+    """
+    Set the thread or process pool used by `dump_async` and `dump_many_async`.
+    Passing None reverts to the event loop's default executor.
+    """
+    _async_dumper.executor = executor
+
+
+async def dump_async(obj):
+    return await _async_dumper.dump(obj)
+
+
+async def dump_many_async(objs):
+    return await _async_dumper.dump_many(objs)
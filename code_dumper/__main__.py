@@ -0,0 +1,5 @@
+import sys
+
+from code_dumper.cli import main
+
+sys.exit(main())
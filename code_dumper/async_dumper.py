@@ -0,0 +1,184 @@
+import asyncio
+from concurrent.futures import Executor
+from functools import partial
+from itertools import islice
+from typing import Dict, List
+
+from code_dumper.dumper import CodeDumper
+from code_dumper.helpers import get_name_from_obj, get_source_from_obj, log
+
+
+def _dump_names(source: str, names: List[str]) -> list:
+    """
+    Analyse `source` once and dump every name from it. This runs inside the
+    executor, so it has to stay a picklable module-level function for process
+    pools.
+    :param source: The module source.
+    :param names: The names to be dumped.
+    :return: A list of (success, code or exception) pairs, one per name.
+    """
+    cd = CodeDumper(source)
+    results = []
+    for name in names:
+        try:
+            results.append((True, cd.dump(name)))
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+
+def _read_sources(objs: list) -> list:
+    """
+    Read the module source of every object. This is file I/O, so it runs in
+    an executor as well, but always in this process, where the sources are
+    cached.
+    :param objs: The target functions/classes.
+    :return: A list of (success, (source, name) or exception) pairs, one per
+        object.
+    """
+    results = []
+    for obj in objs:
+        try:
+            results.append((True, (get_source_from_obj(obj),
+                                   get_name_from_obj(obj))))
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+
+class _Batch:
+    """
+    The names requested from a single module, waiting on one analysis.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.futures: Dict[str, asyncio.Future] = {}
+
+
+class AsyncDumper:
+    """
+    Run dumps in an executor so the event loop isn't blocked by the analysis.
+    Requests for the same module that arrive together are coalesced into a
+    single analysis, which then dumps every requested name.
+    """
+
+    def __init__(self, executor: Executor = None):
+        """
+        Create a new AsyncDumper.
+        :param executor: The thread or process pool to analyse in. If not
+            provided, the event loop's default executor is used.
+        """
+        self.executor = executor
+        self._batches: Dict[tuple, _Batch] = {}
+        self._reads: Dict[asyncio.AbstractEventLoop, list] = {}
+
+    async def dump(self, obj) -> str:
+        """
+        Dump the given object's source code without blocking the event loop.
+        :param obj: The target function/class.
+        :return: The source code as a string.
+        """
+        return (await self.dump_many([obj]))[0]
+
+    async def dump_many(self, objs) -> List[str]:
+        """
+        Dump several objects, analysing each module they come from only once.
+        :param objs: The target functions/classes.
+        :return: The source code for each object, in the same order.
+        """
+        loop = asyncio.get_running_loop()
+        futures = []
+        for success, value in await self._read(loop, list(objs)):
+            if not success:
+                raise value
+            source, name = value
+            futures.append(self._submit(loop, source, name))
+        return list(await asyncio.gather(*futures))
+
+    def _read(self, loop, objs: list) -> asyncio.Future:
+        """
+        Read the sources of `objs` in the default executor, along with every
+        other read requested in this iteration of the loop. Their requests
+        then resume together, so they still end up in the same batches.
+        :return: A future of the results of `_read_sources(objs)`.
+        """
+        reads = self._reads.get(loop)
+        if reads is None:
+            reads = self._reads[loop] = []
+            loop.call_soon(self._start_reads, loop, reads)
+        future = loop.create_future()
+        reads.append((objs, future))
+        return future
+
+    def _start_reads(self, loop, reads: list):
+        del self._reads[loop]
+        objs = [obj for request_objs, _ in reads for obj in request_objs]
+        future = loop.run_in_executor(None, _read_sources, objs)
+        future.add_done_callback(partial(self._finish_reads, reads))
+
+    def _finish_reads(self, reads: list, future: asyncio.Future):
+        if future.cancelled() or future.exception():
+            error = (asyncio.CancelledError() if future.cancelled()
+                     else future.exception())
+            for _, fut in reads:
+                if not fut.done():
+                    fut.set_exception(error)
+            return
+
+        results = iter(future.result())
+        for objs, fut in reads:
+            request_results = list(islice(results, len(objs)))
+            if not fut.done():
+                fut.set_result(request_results)
+
+    def _submit(self, loop, source: str, name: str) -> asyncio.Future:
+        """
+        Add `name` to the pending batch for `source`, or join the in-flight
+        one if it's already dumping that name.
+        """
+        key = (loop, source)
+        batch = self._batches.get(key)
+        if batch is None or (batch.started and name not in batch.futures):
+            # Start on the next iteration of the loop, so that every request
+            # made in this one ends up in the same batch.
+            batch = _Batch()
+            self._batches[key] = batch
+            loop.call_soon(self._start, loop, key, batch)
+
+        if name not in batch.futures:
+            batch.futures[name] = loop.create_future()
+        else:
+            log("Coalescing dump of `%s` onto in-flight analysis", name)
+        # Shield, so one cancelled caller doesn't cancel the others.
+        return asyncio.shield(batch.futures[name])
+
+    def _start(self, loop, key: tuple, batch: _Batch):
+        batch.started = True
+        names = list(batch.futures)
+        log("Analysing module for %d name(s): %s", len(names), names)
+        future = loop.run_in_executor(self.executor, _dump_names,
+                                      key[1], names)
+        future.add_done_callback(partial(self._finish, key, batch, names))
+
+    def _finish(self, key: tuple, batch: _Batch, names: List[str],
+                future: asyncio.Future):
+        if self._batches.get(key) is batch:
+            del self._batches[key]
+
+        if future.cancelled() or future.exception():
+            error = (asyncio.CancelledError() if future.cancelled()
+                     else future.exception())
+            for fut in batch.futures.values():
+                if not fut.done():
+                    fut.set_exception(error)
+            return
+
+        for name, (success, value) in zip(names, future.result()):
+            fut = batch.futures[name]
+            if fut.done():
+                continue
+            if success:
+                fut.set_result(value)
+            else:
+                fut.set_exception(value)
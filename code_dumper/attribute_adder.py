@@ -2,6 +2,7 @@ import ast
 from functools import partial
 from typing import Union
 
+from code_dumper.budget import Budget
 from code_dumper.finder import NodeFinder
 from code_dumper.types import code_block_nodes, variable_scope_nodes
 
@@ -16,7 +17,7 @@ class AttributeAdder(ast.NodeVisitor):
      - node.var_scope       -> The variable scope this node exists in.
      - node.find_ancestor() -> Find the first ancestor node that matches the
                                query. Returns False if none found.
-     On FunctionDefs,
+     On FunctionDefs and AsyncFunctionDefs,
        - qualname           -> The qualified name, equivalent to `__qualname__`
                                on a function.
        - ismethod           -> Whether the function belongs to a class or is
@@ -26,11 +27,20 @@ class AttributeAdder(ast.NodeVisitor):
                             on a class.
     """
 
-    def __init__(self, root):
+    def __init__(self, root, budget: Budget = None):
+        """
+        :param root: The root node.
+        :param budget: Checked for every node, refer to `Budget`.
+        """
         super().__init__()
         self.root = root
+        self.budget = budget
         self.qualname_stack = []
 
+        # The queries run for every node, compiled once.
+        self.is_var_scope = NodeFinder.compile(variable_scope_nodes)
+        self.is_code_block = NodeFinder.compile(code_block_nodes)
+
     @staticmethod
     def find_ancestor(node, nf_type=None, **properties) -> Union[ast.AST, bool]:
         """
@@ -42,14 +52,24 @@ class AttributeAdder(ast.NodeVisitor):
             `NodeFinder.matches` for details.
         :return: The found ancestor or False if none found.
         """
+        predicate = NodeFinder.compile(nf_type, **properties)
+        return AttributeAdder._find_ancestor(node, predicate)
+
+    @staticmethod
+    def _find_ancestor(node, predicate) -> Union[ast.AST, bool]:
+        """
+        Same as `find_ancestor`, with an already compiled query.
+        """
         n = node
         while hasattr(n, 'parent'):
             n = n.parent
-            if NodeFinder.matches(n, nf_type=nf_type, **properties):
+            if predicate(n):
                 return n
         return False
 
     def visit(self, node):
+        if self.budget:
+            self.budget.check()
         for child in ast.iter_child_nodes(node):
             # Add the parent ref.
             child.parent = node
@@ -57,12 +77,13 @@ class AttributeAdder(ast.NodeVisitor):
         node.find_ancestor = partial(self.find_ancestor, node)
 
         # Add variable scopes.
-        node.var_scope = node.find_ancestor(variable_scope_nodes) or self.root
+        node.var_scope = self._find_ancestor(node, self.is_var_scope) or \
+            self.root
         if node == self.root:
             node.var_scope = False
 
         # Add parent code block
-        node.parent_block = node.find_ancestor(code_block_nodes)
+        node.parent_block = self._find_ancestor(node, self.is_code_block)
 
         super().visit(node)
 
@@ -80,6 +101,8 @@ class AttributeAdder(ast.NodeVisitor):
         self.qualname_stack.pop()
         self.qualname_stack.pop()
 
+    visit_AsyncFunctionDef = visit_FunctionDef
+
     def visit_ClassDef(self, node):
         self.qualname_stack.append(node.name)
 
@@ -0,0 +1,125 @@
+import threading
+import time
+
+from code_dumper.hooks import Hook
+
+
+class DumpCancelled(RuntimeError):
+    """
+    The analysis or a dump was cancelled through its `Budget`.
+    """
+
+    def __init__(self, phase: str, message: str = None):
+        """
+        :param phase: The phase that was running, refer to `Hook.phase_start`.
+            None if none had started yet.
+        """
+        super().__init__(message or "Cancelled during the {} phase."
+                         .format(phase))
+        self.phase = phase
+
+
+class DumpTimeout(DumpCancelled):
+    """
+    The analysis or a dump ran past the deadline of its `Budget`.
+    """
+
+    def __init__(self, phase: str, deadline: float):
+        super().__init__(phase, "Ran past the deadline during the {} phase."
+                         .format(phase))
+        self.deadline = deadline
+
+
+class CancellationToken:
+    """
+    Cancels every analysis and dump whose `Budget` has it, from any thread.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+class Budget(Hook):
+    """
+    A time limit and/or a cancellation token for `CodeDumper`, which checks
+    it periodically while building the AST attributes and the dependencies,
+    for every statement the parser parses, and for every statement and
+    variable a dump loads. Once the deadline passes or the token is
+    cancelled, the next check raises `DumpTimeout` or `DumpCancelled`, with
+    the phase that was running.
+
+    A budget covers whatever it's passed to: a CodeDumper's analysis, or a
+    single dump. The same budget can be passed to several of them, in several
+    threads, to limit them all together. `ast.parse` itself can't be
+    interrupted.
+    """
+
+    # Checks between two looks at the clock and the token.
+    interval = 64
+
+    def __init__(self, timeout: float = None, deadline: float = None,
+                 token: CancellationToken = None):
+        """
+        :param timeout: Seconds from now until the deadline.
+        :param deadline: The deadline as a `time.monotonic()` time, instead of
+            `timeout`.
+        :param token: A token to cancel with.
+        """
+        if timeout is not None and deadline is not None:
+            raise ValueError("Pass either a timeout or a deadline, not both.")
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+        self.deadline = deadline
+        self.token = token
+
+        # The last phase that started and the checks until the next look,
+        # per thread.
+        self._local = threading.local()
+
+    @property
+    def phase(self) -> str:
+        """
+        The last phase that started in this thread.
+        """
+        return getattr(self._local, 'phase', None)
+
+    def check(self):
+        """
+        Raise if the deadline passed or the token was cancelled. Only looks
+        every `interval` calls, so it's cheap to call in loops.
+        """
+        countdown = getattr(self._local, 'countdown', 0)
+        if countdown:
+            self._local.countdown = countdown - 1
+            return
+        self._local.countdown = self.interval - 1
+        self.check_now()
+
+    def check_now(self):
+        """
+        Raise if the deadline passed or the token was cancelled.
+        """
+        if self.token is not None and self.token.cancelled:
+            raise DumpCancelled(self.phase)
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise DumpTimeout(self.phase, self.deadline)
+
+    def phase_start(self, phase):
+        self._local.phase = phase
+        self.check_now()
+
+    def statement_parsed(self, stmt, lineno, depth):
+        self.check()
+
+    def statement_loaded(self, stmt, lineno, depth):
+        self.check()
+
+    def variable_loaded(self, mv, depth):
+        self.check()
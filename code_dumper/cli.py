@@ -0,0 +1,80 @@
+import argparse
+import json
+import logging
+import sys
+
+
+def _serve(args):
+    from code_dumper.server import serve
+    serve(args.socket, cache_size=args.cache_size)
+
+
+def _dump(args):
+    from code_dumper.server import DumpClient
+    with DumpClient(args.socket) as client:
+        if len(args.names) == 1:
+            print(client.dump(args.path, args.names[0]))
+        else:
+            print('\n\n'.join(client.dump_many(args.path, args.names)))
+
+
+def _names(args):
+    from code_dumper.server import DumpClient
+    with DumpClient(args.socket) as client:
+        print('\n'.join(client.names(args.path)))
+
+
+def _dependents(args):
+    from code_dumper.server import DumpClient
+    target = int(args.target) if args.target.isdigit() else args.target
+    with DumpClient(args.socket) as client:
+        print('\n'.join(client.dependents(args.path, target)))
+
+
+def _stats(args):
+    from code_dumper.server import DumpClient
+    with DumpClient(args.socket) as client:
+        print(json.dumps(client.stats(), indent=2))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='code-dumper')
+    parser.add_argument('--socket', default=None,
+                        help='Path of the daemon socket.')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='Show debug logs.')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    serve = commands.add_parser('serve', help='Run the dump daemon.')
+    serve.add_argument('--cache-size', type=int, default=32,
+                       help='Number of analysed modules to keep warm.')
+    serve.set_defaults(func=_serve)
+
+    dump = commands.add_parser('dump', help='Dump names from a file.')
+    dump.add_argument('path')
+    dump.add_argument('names', nargs='+')
+    dump.set_defaults(func=_dump)
+
+    names = commands.add_parser('names', help='List dumpable names.')
+    names.add_argument('path')
+    names.set_defaults(func=_names)
+
+    dependents = commands.add_parser(
+        'dependents', help='List names whose dumps include a line/function.')
+    dependents.add_argument('path')
+    dependents.add_argument('target', help='Line number or qualified name.')
+    dependents.set_defaults(func=_dependents)
+
+    stats = commands.add_parser('stats', help='Show daemon statistics.')
+    stats.set_defaults(func=_stats)
+
+    args = parser.parse_args(argv)
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG)
+    try:
+        args.func(args)
+    except (ConnectionError, FileNotFoundError, RuntimeError) as e:
+        print('code-dumper: {}'.format(e), file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,326 @@
+import ast
+from typing import Dict, Iterable, List, Set, Tuple
+
+from code_dumper.memory import MemoryVariable
+from code_dumper.variables import VariableReference
+
+
+class ClosureIndex:
+    """
+    Resolves what every root-scope name needs at once, in roughly the time of
+    a single pass over the dependency graph.
+
+    The graph has a node for every statement and MemoryVariable, the same
+    edges that `CodeDumper._resolve_stmt_dependencies` and
+    `CodeDumper._resolve_variable_dependencies` follow, and an edge from each
+    statement to the statements nested in it. Its strongly connected
+    components are condensed, and each component gets the bitset of the
+    root-level statements it reaches, as a Python int. Bitsets are built in
+    one pass in reverse topological order, so a closure is the OR of a few
+    of them.
+
+    A dump doesn't revisit the variables of the name being dumped, which
+    makes their outgoing edges depend on the name. So the variables of the
+    names are sinks in the graph, and get a bit each. A closure then expands
+    the reached ones, other than its own, until nothing new is reached.
+
+    The same graph answers the reverse question, which names reach every
+    node, with one more pass in topological order, refer to
+    `ClosureIndex.get_dependents`.
+    """
+
+    def __init__(self, dumper, names: List[str]):
+        """
+        :param dumper: The analysed CodeDumper.
+        :param names: The root-scope names that closures will be asked for.
+        """
+        self.dumper = dumper
+        self.names = names
+        root_scp = dumper.scope_map.get(dumper.root)
+
+        # The variables that are sinks, and their bits.
+        self.targets: Dict[MemoryVariable, int] = {}
+        for name in names:
+            for mv in root_scp.get(name):
+                self.targets.setdefault(mv, len(self.targets))
+
+        self._build_graph()
+        self._propagate()
+
+    def _build_graph(self):
+        root = self.dumper.root
+        ids = {}
+        nodes = []
+        edges = []
+
+        def node_id(node):
+            if node not in ids:
+                ids[node] = len(nodes)
+                nodes.append(node)
+                edges.append(None)
+            return ids[node]
+
+        # The root-level statement that every statement's lines belong to.
+        self.root_positions = {stmt: i for i, stmt in enumerate(root.body)}
+        self._intervals = [range(*self.dumper._get_line_interval(stmt))
+                           for stmt in root.body]
+        offset = len(root.body)
+
+        own_bits = []
+        pending = [node_id(stmt) for stmt in root.body]
+        pending.extend(node_id(mv) for mv in self.targets)
+        budget = self.dumper.budget
+        runs_on_import = self.dumper.parser.runs_on_import
+        while pending:
+            if budget:
+                budget.check()
+            i = pending.pop()
+            if edges[i] is not None:
+                continue
+            node = nodes[i]
+            successors = []
+            if isinstance(node, MemoryVariable):
+                if node not in self.targets:
+                    successors.extend(filter(runs_on_import, node))
+            else:
+                successors.extend(self._get_successors(node))
+            edges[i] = [node_id(successor) for successor in successors]
+            pending.extend(edges[i])
+
+        for node in nodes:
+            if isinstance(node, MemoryVariable):
+                bit = self.targets.get(node)
+                own_bits.append(0 if bit is None else 1 << (offset + bit))
+            else:
+                top = node
+                while top.parent_block:
+                    top = top.parent_block
+                own_bits.append(1 << self.root_positions[top])
+
+        self._ids = ids
+        self._nodes = nodes
+        self._edges = edges
+        self._own_bits = own_bits
+        self._offset = offset
+
+    @staticmethod
+    def _get_successors(stmt: ast.stmt) -> Iterable:
+        """
+        Get the variables that `stmt` itself depends on, and the statements
+        directly nested in it. The nested statements stand in for the rest of
+        `ast.walk(stmt)`.
+        """
+        pending = [stmt]
+        while pending:
+            node = pending.pop()
+            if node is not stmt and isinstance(node, ast.stmt):
+                yield node
+                continue
+            for dep in node.dependencies:
+                if isinstance(dep, VariableReference):
+                    yield from dep
+            pending.extend(ast.iter_child_nodes(node))
+
+    def _propagate(self):
+        """
+        Condense the graph with Tarjan's algorithm and compute the reachable
+        bits of every component. Tarjan's algorithm finishes a component
+        after every component it reaches, so bits can be computed as the
+        components come out.
+        """
+        edges = self._edges
+        count = len(edges)
+        index = [-1] * count
+        lowlink = [0] * count
+        on_stack = [False] * count
+        component = [-1] * count
+        component_bits = []
+        stack = []
+        counter = 0
+
+        budget = self.dumper.budget
+        for start in range(count):
+            if budget:
+                budget.check()
+            if index[start] != -1:
+                continue
+            work = [(start, 0)]
+            while work:
+                v, child = work.pop()
+                if child == 0:
+                    index[v] = lowlink[v] = counter
+                    counter += 1
+                    stack.append(v)
+                    on_stack[v] = True
+                successors = edges[v]
+                recursed = False
+                while child < len(successors):
+                    w = successors[child]
+                    child += 1
+                    if index[w] == -1:
+                        work.append((v, child))
+                        work.append((w, 0))
+                        recursed = True
+                        break
+                    if on_stack[w]:
+                        lowlink[v] = min(lowlink[v], index[w])
+                if recursed:
+                    continue
+
+                if lowlink[v] == index[v]:
+                    # v is the root of a component, pop all of it.
+                    members = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        component[w] = len(component_bits)
+                        members.append(w)
+                        if w == v:
+                            break
+                    bits = 0
+                    for w in members:
+                        bits |= self._own_bits[w]
+                        for x in edges[w]:
+                            if component[x] != -1 and component[x] != \
+                                    component[w]:
+                                bits |= component_bits[component[x]]
+                    component_bits.append(bits)
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[v])
+
+        self._component = component
+        self._component_bits = component_bits
+
+        # What expanding each target adds, i.e. everything its usages reach.
+        self._target_bits = {}
+        for mv, bit in self.targets.items():
+            bits = 0
+            for stmt in filter(self.dumper.parser.runs_on_import, mv):
+                bits |= self._get_bits(stmt)
+            self._target_bits[bit] = bits
+
+    def _get_bits(self, node) -> int:
+        i = self._ids.get(node)
+        if i is None:
+            return 0
+        return self._component_bits[self._component[i]]
+
+    def _reach(self, name: str) -> Tuple[int, int]:
+        """
+        :return: The bits that a dump of `name` reaches, and those of the
+            targets that it expands.
+        """
+        root_scp = self.dumper.scope_map.get(self.dumper.root)
+        reached = 0
+        blocked = 0
+        expanded = 0
+        # Like `CodeDumper._resolve_names`, every variable of the name is only
+        # excluded from the definitions that are resolved after it.
+        for mv in root_scp.get(name):
+            blocked |= 1 << self.targets[mv]
+            reached |= self._get_bits(mv.definition)
+
+            while True:
+                new = (reached >> self._offset) & ~blocked & ~expanded
+                if not new:
+                    break
+                expanded |= new
+                while new:
+                    low = new & -new
+                    reached |= self._target_bits[low.bit_length() - 1]
+                    new ^= low
+        return reached, expanded
+
+    def get_closure(self, name: str) -> Set[int]:
+        """
+        Get the line numbers that a dump of `name` includes. Equivalent to
+        `CodeDumper._resolve_name(name)` without tree shaking.
+        """
+        reached, _ = self._reach(name)
+        line_numbers = set()
+        statements = reached & ((1 << self._offset) - 1)
+        while statements:
+            low = statements & -statements
+            line_numbers.update(self._intervals[low.bit_length() - 1])
+            statements ^= low
+        return line_numbers
+
+    def get_dependents(self) -> Tuple[Dict[object, Set[str]],
+                                      Dict[int, Set[str]]]:
+        """
+        Find the names whose dumps load every statement and MemoryVariable,
+        and include every line. Equivalent to inverting
+        `CodeDumper._resolve_name(name)` for every name, without tree shaking.
+
+        Each name gets a bit, starting from the nodes its dump resolves
+        directly: the definitions and variables of the name, and the usages of
+        the targets it expands. The bits flow along the edges of the condensed
+        graph in a single pass in topological order, which is the reverse of
+        the order Tarjan's algorithm finishes the components in.
+        :return: The names by statement and MemoryVariable, and by line
+            number.
+        """
+        root_scp = self.dumper.scope_map.get(self.dumper.root)
+        runs_on_import = self.dumper.parser.runs_on_import
+        targets = list(self.targets)
+        component = self._component
+        edges = self._edges
+        bits = [0] * len(self._component_bits)
+        root_bits = [0] * self._offset
+
+        for k, name in enumerate(self.names):
+            bit = 1 << k
+            reached, expanded = self._reach(name)
+            entries = []
+            for mv in root_scp.get(name):
+                entries.append(mv)
+                entries.append(mv.definition)
+            while expanded:
+                low = expanded & -expanded
+                entries.extend(filter(runs_on_import,
+                                      targets[low.bit_length() - 1]))
+                expanded ^= low
+            for entry in entries:
+                i = self._ids.get(entry)
+                if i is not None:
+                    bits[component[i]] |= bit
+
+            statements = reached & ((1 << self._offset) - 1)
+            while statements:
+                low = statements & -statements
+                root_bits[low.bit_length() - 1] |= bit
+                statements ^= low
+
+        members = [[] for _ in bits]
+        for i, c in enumerate(component):
+            members[c].append(i)
+        for c in range(len(bits) - 1, -1, -1):
+            if not bits[c]:
+                continue
+            for w in members[c]:
+                for x in edges[w]:
+                    if component[x] != c:
+                        bits[component[x]] |= bits[c]
+
+        # Nodes reached by the same names share their set.
+        name_sets = {}
+
+        def get_names(name_bits: int) -> Set[str]:
+            if name_bits not in name_sets:
+                name_sets[name_bits] = {
+                    name for k, name in enumerate(self.names)
+                    if name_bits >> k & 1}
+            return name_sets[name_bits]
+
+        dependents = {node: get_names(bits[component[i]])
+                      for i, node in enumerate(self._nodes)
+                      if bits[component[i]]}
+        line_dependents = {}
+        for position, name_bits in enumerate(root_bits):
+            if name_bits:
+                names = get_names(name_bits)
+                for line_number in self._intervals[position]:
+                    line_dependents[line_number] = \
+                        line_dependents.get(line_number, set()) | names
+        return dependents, line_dependents
@@ -0,0 +1,186 @@
+import hashlib
+import importlib.util
+import marshal
+import os
+import sys
+import tempfile
+import threading
+import types
+from typing import List
+
+# Marshalled code objects are only valid for the interpreter that made them,
+# so every cached code object is keyed by this as well as by its content.
+BYTECODE_TAG = '{}-{}'.format(sys.implementation.cache_tag,
+                              importlib.util.MAGIC_NUMBER.hex())
+
+
+def get_digest(source: str) -> str:
+    """
+    The content hash of some dumped source code.
+    """
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+class CompiledDump:
+    """
+    The output of a dump, along with its content hash and the compiled,
+    marshal-serialized code object.
+    """
+
+    def __init__(self, source: str, digest: str, code: bytes,
+                 tag: str = BYTECODE_TAG):
+        """
+        :param source: The dumped source code.
+        :param digest: The content hash of `source`.
+        :param code: The marshal-serialized code object for `source`.
+        :param tag: The interpreter that `code` was compiled for.
+        """
+        self.source = source
+        self.digest = digest
+        self.code = code
+        self.tag = tag
+
+    @classmethod
+    def from_source(cls, source: str) -> 'CompiledDump':
+        digest = get_digest(source)
+        code = compile(source, get_filename(digest), 'exec')
+        return cls(source, digest, marshal.dumps(code))
+
+    def to_code(self) -> types.CodeType:
+        """
+        Get the code object, recompiling if the code was compiled by a
+        different interpreter.
+        """
+        if self.tag == BYTECODE_TAG:
+            return marshal.loads(self.code)
+        return compile(self.source, get_filename(self.digest), 'exec')
+
+
+def get_filename(digest: str) -> str:
+    """
+    The filename that dumped code is compiled with, to tell it apart in
+    tracebacks.
+    """
+    return '<code-dumper:{}>'.format(digest[:12])
+
+
+class CodeCache:
+    """
+    A content-addressed cache for compiled dumps. It holds two maps:
+      - dump key -> content hash, where the dump key identifies the module
+        source and the dumped name. This lets repeated submissions skip the
+        analysis entirely.
+      - (content hash, interpreter) -> CompiledDump, which lets both sides
+        skip compilation.
+    Everything is kept in memory, and also on disk if a directory is given.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = directory
+        self._digests = {}
+        self._dumps = {}
+        self._code_objects = {}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(os.path.join(directory, 'keys'), exist_ok=True)
+
+    @staticmethod
+    def make_key(module_source: str, name: str,
+                 methods: List[str] = None) -> str:
+        """
+        The dump key for dumping `name` (with `methods`) from a module.
+        """
+        parts = [module_source, name, *(methods or [])]
+        return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+    def get_digest(self, key: str) -> str:
+        """
+        Get the content hash for a dump key, or None if it isn't cached.
+        """
+        with self._lock:
+            if key in self._digests:
+                return self._digests[key]
+        data = self._read(os.path.join('keys', key))
+        if data is None:
+            return None
+        digest = data.decode('ascii')
+        with self._lock:
+            self._digests[key] = digest
+        return digest
+
+    def set_digest(self, key: str, digest: str):
+        with self._lock:
+            self._digests[key] = digest
+        self._write(os.path.join('keys', key), digest.encode('ascii'))
+
+    def get(self, digest: str) -> CompiledDump:
+        """
+        Get the compiled dump for a content hash, or None if it isn't cached
+        for this interpreter.
+        """
+        with self._lock:
+            if digest in self._dumps:
+                return self._dumps[digest]
+        data = self._read('{}-{}'.format(digest, BYTECODE_TAG))
+        if data is None:
+            return None
+        source, code = marshal.loads(data)
+        compiled = CompiledDump(source, digest, code)
+        with self._lock:
+            self._dumps[digest] = compiled
+        return compiled
+
+    def put(self, compiled: CompiledDump):
+        if compiled.tag != BYTECODE_TAG:
+            return
+        with self._lock:
+            self._dumps[compiled.digest] = compiled
+        self._write('{}-{}'.format(compiled.digest, BYTECODE_TAG),
+                    marshal.dumps((compiled.source, compiled.code)))
+
+    def compile(self, source: str) -> CompiledDump:
+        """
+        Get the compiled dump for `source`, compiling it only if it isn't
+        cached yet.
+        """
+        digest = get_digest(source)
+        compiled = self.get(digest)
+        if compiled is None:
+            compiled = CompiledDump.from_source(source)
+            self.put(compiled)
+        return compiled
+
+    def load(self, compiled: CompiledDump) -> types.CodeType:
+        """
+        Get the code object for a compiled dump. This is meant for the worker
+        side, where the same dump tends to be executed repeatedly.
+        """
+        with self._lock:
+            if compiled.digest in self._code_objects:
+                return self._code_objects[compiled.digest]
+        if compiled.tag != BYTECODE_TAG:
+            # Compiled for another interpreter, use ours if we have it.
+            compiled = self.get(compiled.digest) or compiled
+        code = compiled.to_code()
+        with self._lock:
+            self._code_objects[compiled.digest] = code
+        return code
+
+    def _read(self, name: str):
+        if not self.directory:
+            return None
+        try:
+            with open(os.path.join(self.directory, name), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, name: str, data: bytes):
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, name)
+        # Write to a temporary file first, so readers never see half a file.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
@@ -1,46 +1,253 @@
 import ast
-from typing import Set
+import hashlib
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set, Tuple, Union
 
 from code_dumper.attribute_adder import AttributeAdder
+from code_dumper.budget import Budget
+from code_dumper.closures import ClosureIndex
+from code_dumper.compiled import CodeCache, CompiledDump
 from code_dumper.finder import NodeFinder
 from code_dumper.helpers import get_name_nodes, log, log_return
+from code_dumper.hooks import Hook, HookList
+from code_dumper.imports import ImportTrimmer
+from code_dumper.lazy_imports import LazyImportDump, LazyImportPlanner
 from code_dumper.memory import MemoryVariable
 from code_dumper.parser import Parser
+from code_dumper.sources import Source
+from code_dumper.statements import (BlockSplitter, get_header_nodes,
+                                    splittable_nodes)
 from code_dumper.types import variable_scope_nodes
 from code_dumper.variables import VariableReference, VariableScopeMap
 
+# The nodes that `CodeDumper.compact` keeps. `match` only exists on Python
+# 3.10+, and `isinstance` accepts the nested empty tuple before that.
+_compact_node_types = (ast.Module, ast.stmt, ast.excepthandler,
+                       getattr(ast, 'match_case', ()))
+
 
 class CodeDumper:
     """
         Given a target function/class, dump only the minimum amount of source
         code needed for the target to work properly, stripping unnecessary
         function definitions, variables, and import statements.
+
+        The analysis is built and then frozen in the constructor. Dumping only
+        reads from it, so a single instance can be shared between threads.
         """
 
-    def __init__(self, source):
+    def __init__(self, source, hooks: List[Hook] = None,
+                 drop_annotations: bool = False,
+                 statement_level: bool = False, budget: Budget = None):
         """
         Create a CodeDumper instance to dump the minimum amount of code needed
         for the target `obj` to run successfully.
+        :param source: The module source. If it's a `Source`, its split lines
+            are reused.
+        :param hooks: Hooks to notify of the analysis and of every dump.
+        :param drop_annotations: Don't include what's only needed by
+            annotations, such as typing-only imports under `if
+            TYPE_CHECKING:`. Dumps with annotations start with `from
+            __future__ import annotations` instead, so they're never
+            evaluated.
+        :param statement_level: Dump the statements needed from `if`,
+            `for`, `while`, `with` and `try` blocks with only the headers of
+            the blocks, instead of the whole blocks. Refer to `BlockSplitter`.
+        :param budget: A time limit and/or cancellation token for the
+            analysis, refer to `Budget`. Dumps take their own.
         """
+        # The hooks of every operation. A budget only covers the operation
+        # it's passed to, in the thread that runs it, refer to `_use_budget`.
+        self._hooks = HookList(hooks)
+        self._local = threading.local()
+        self.drop_annotations = drop_annotations
+        self.splitter = BlockSplitter(self) if statement_level else None
+
+        # Root-level statements with annotations that aren't evaluated, which
+        # need the __future__ import in dumps.
+        self._annotated: Set[ast.stmt] = set()
+
+        # Only the analysis runs with the budget.
+        self._enter_budget(budget)
+
         # Get module source and build the AST
-        self.source = source.split('\n')
-        self.root = ast.parse(source)
+        with self.hooks.phase('ast'):
+            self.source = (source.lines if isinstance(source, Source)
+                           else source.split('\n'))
+            self.root = ast.parse(source)
 
-        # Instantiate a finder to help find nodes easier.
-        self.finder = NodeFinder(self.root)
+            # Instantiate a finder to help find nodes easier.
+            self.finder = NodeFinder(self.root)
 
         # Modify the AST with attributes that help us achieve the objective.
-        AttributeAdder(self.root).visit(self.root)
+        with self.hooks.phase('attributes'):
+            AttributeAdder(self.root, budget).visit(self.root)
+
+        # The imports with several aliases, along with the statements that use
+        # the names they bind, and their trimmed sources by the aliases kept.
+        # Refer to `ImportTrimmer`.
+        self.multi_imports: Dict[ast.stmt,
+                                 List[Tuple[str, Optional[str]]]] = {}
+        self.import_users: Dict[str, List[ast.stmt]] = {}
+        self.trimmed_imports: Dict[Tuple[ast.stmt, Tuple[int, ...]],
+                                   Optional[str]] = {}
 
         # Add a .dependencies attribute on every node. This has to happen after
         # AttributeAdder runs, because it needs node.var_scope.
-        self._calculate_node_dependencies()
+        with self.hooks.phase('dependencies'):
+            self._calculate_node_dependencies()
 
         # Create a VariableScopeMap to track every variable.
-        self.scope_map = VariableScopeMap(self.root)
+        self.scope_map = VariableScopeMap(self.root, self.hooks)
 
         # Construct our understanding of the code.
-        self.parser = Parser(self.root, self.scope_map)
+        with self.hooks.phase('parser'):
+            self.parser = Parser(self.root, self.scope_map, self.finder,
+                                 self.hooks)
+
+        # "Execute" every function and class that can be dumped up front, so
+        # the analysis doesn't depend on which names get dumped, or in which
+        # order. Only the bodies that run on import affect every dump, refer
+        # to `Parser.runs_on_import`. Nothing may modify it from here on.
+        with self.hooks.phase('targets'):
+            self.parser.parse_targets()
+        self.scope_map.freeze()
+        self._local.__dict__.clear()
+
+        # Reverse dependency index, built on demand by `build_reverse_index`.
+        self._dependents: Dict[Union[ast.stmt, MemoryVariable],
+                               Set[str]] = None
+        self._line_dependents: Dict[int, Set[str]] = None
+        self._reverse_index_lock = threading.Lock()
+
+        # Normalized AST hashes of root-level statements, for `fingerprint`.
+        self._stmt_hashes: Dict[ast.stmt, str] = {}
+
+        # Functions and classes by qualified name, built on demand.
+        self._qualnames: Dict[str, ast.stmt] = None
+
+        # Whether `compact` dropped the expression-level AST.
+        self.compacted = False
+
+    @property
+    def hooks(self) -> HookList:
+        """
+        The hooks of the operation running in this thread, led by its budget
+        if it has one.
+        """
+        return getattr(self._local, 'hooks', self._hooks)
+
+    @property
+    def budget(self) -> Optional[Budget]:
+        """
+        The budget of the operation running in this thread, if any.
+        """
+        return getattr(self._local, 'budget', None)
+
+    def _enter_budget(self, budget: Optional[Budget]):
+        """
+        Run everything in this thread with a budget, until the thread's state
+        is restored. Without a budget, nothing changes.
+        """
+        if budget is not None:
+            self._local.budget = budget
+            # The budget goes first, so that no other hook sees a phase start
+            # if it's already over.
+            self._local.hooks = HookList([budget, *self._hooks.hooks])
+
+    @contextmanager
+    def _use_budget(self, budget: Optional[Budget]):
+        """
+        Run the body with a budget, in this thread only. Without one, it runs
+        with the budget of the operation that it's part of, if any.
+        """
+        previous = dict(self._local.__dict__)
+        self._enter_budget(budget)
+        try:
+            yield
+        finally:
+            self._local.__dict__.clear()
+            self._local.__dict__.update(previous)
+
+    def compact(self):
+        """
+        Drop the expression-level AST, which is only needed while analysing.
+        What's kept is a statement-level graph: the statements, their line
+        spans and their resolved dependencies, along with whatever else dumps
+        need precomputed. Dumps stay identical, while the analysis takes
+        several times less memory, which matters for long-lived caches.
+
+        This modifies the analysis, so it must not run while other threads
+        are using it.
+        """
+        if self.compacted:
+            return
+
+        with self.hooks.phase('compact'):
+            # Everything that needs the finder or expressions later on.
+            self._find_by_qualname('')
+            for stmt in self.root.body:
+                self._get_node_hash(stmt)
+                stmt.line_interval = self._get_line_interval(stmt)
+                if not isinstance(stmt, ast.ClassDef):
+                    continue
+                self._get_node_hash(('header', stmt))
+                for member in stmt.body:
+                    self._get_node_hash(member)
+                    member.line_interval = self._get_line_interval(member)
+                    if isinstance(member, (ast.FunctionDef,
+                                           ast.AsyncFunctionDef)):
+                        member.first_arg = self._get_first_arg(member)
+                        member.attribute_accesses = \
+                            self._get_attribute_accesses(member)
+            for node in ast.walk(self.root):
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    node.has_docstring = self._has_docstring(node)
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef,
+                                     ast.ClassDef)):
+                    node.decorating_functions = \
+                        self._get_decorating_functions(node)
+
+            for node in list(ast.walk(self.root)):
+                if isinstance(node, _compact_node_types):
+                    self._compact_node(node)
+
+            self.finder = None
+            self.parser.finder = None
+        self.compacted = True
+
+    def _compact_node(self, node: ast.AST):
+        """
+        Drop everything but the statement-level children of a node, and keep
+        only its resolved dependencies.
+        """
+        if getattr(node, 'decorator_list', None):
+            node.first_lineno = self._get_first_lineno(node)
+
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, list):
+                if any(isinstance(child, ast.AST) and
+                       not isinstance(child, _compact_node_types)
+                       for child in value):
+                    setattr(node, field, [])
+            elif (isinstance(value, ast.AST) and
+                  not isinstance(value, _compact_node_types)):
+                setattr(node, field, None)
+
+        # Only statements have their dependencies resolved, the rest are
+        # ignored when dumping. Statements that were never parsed keep the
+        # identifiers they load instead.
+        node.dependencies = [dep if isinstance(dep, VariableReference)
+                             else dep.id
+                             for dep in getattr(node, 'dependencies', ())]
+        if hasattr(node, 'header_dependencies'):
+            node.header_dependencies = [
+                dep if isinstance(dep, VariableReference) else dep.id
+                for dep in node.header_dependencies]
+        node.__dict__.pop('find_ancestor', None)
 
     def _calculate_node_dependencies(self):
         """
@@ -48,25 +255,39 @@ class CodeDumper:
         contexts to be used when resolving dependencies down the line.
         This has to be done after the variable scopes are populated.
         """
+        unevaluated = self._get_unevaluated_annotations()
+        users = defaultdict(list)
+        budget = self.budget
+
         for node in ast.walk(self.root):
+            if budget:
+                budget.check()
             dependencies = set(get_name_nodes(node, loads=True,
-                                              ignore_root=True))
+                                              ignore_root=True,
+                                              finder=self.finder))
+            dependencies.difference_update(unevaluated)
 
-            # Fix the scope for decorators, base classes, defaults.
-            # It should be set to the parent scope of node, not the node itself.
+            # Fix the scope for decorators, base classes, defaults and
+            # annotations. It should be set to the parent scope of node, not the
+            # node itself.
             to_fix_scopes = []
             if hasattr(node, 'decorator_list'):
                 to_fix_scopes.extend(node.decorator_list)
             if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
                 to_fix_scopes.extend(node.args.defaults)
-                to_fix_scopes.extend(node.args.kw_defaults)
+                # Keyword-only arguments without a default have None.
+                to_fix_scopes.extend(filter(None, node.args.kw_defaults))
+                to_fix_scopes.extend(self._get_annotations(node))
             if isinstance(node, ast.ClassDef):
                 to_fix_scopes.extend(node.keywords)
                 to_fix_scopes.extend(node.bases)
 
             for to_fix in to_fix_scopes:
                 for name in get_name_nodes(to_fix, loads=True,
-                                           ignore_root=False):
+                                           ignore_root=False,
+                                           finder=self.finder):
+                    if name in unevaluated:
+                        continue
                     name.var_scope = node.var_scope
                     dependencies.add(name)
 
@@ -74,41 +295,513 @@ class CodeDumper:
             # outside in order to execute this body of code.
             node.dependencies = list(dep for dep in dependencies
                                      if dep.var_scope is node.var_scope)
+            if isinstance(node, ast.stmt):
+                for dep in node.dependencies:
+                    users[dep.id].append(node)
+            if isinstance(node, (ast.Import, ast.ImportFrom)) and \
+                    len(node.names) > 1:
+                self.multi_imports[node] = [(alias.name, alias.asname)
+                                            for alias in node.names]
+
+            if self.splitter and isinstance(node, splittable_nodes):
+                # What the headers need, when the block is dumped without
+                # its bodies.
+                node.header_dependencies = [
+                    dep for dep in get_name_nodes(list(get_header_nodes(node)),
+                                                  loads=True,
+                                                  finder=self.finder)
+                    if dep.var_scope is node.var_scope and
+                    dep not in unevaluated]
+
+        # Only the users of the names that trimmable imports bind are kept.
+        self.import_users = {
+            name: users[name] for name in
+            {(asname or name).split('.')[0]
+             for aliases in self.multi_imports.values()
+             for name, asname in aliases}
+            if name in users}
 
-    def dump(self, name: str) -> str:
+    def _get_unevaluated_annotations(self) -> Set[ast.Name]:
+        """
+        Find the names in annotations that are never evaluated, i.e. local
+        variable annotations, and all annotations if they're dropped or if the
+        source has `from __future__ import annotations`. In the latter cases,
+        also collect the root-level statements with annotations, since their
+        dumps need the __future__ import.
+        """
+        evaluated = not self.drop_annotations and not any(
+            isinstance(stmt, ast.ImportFrom) and stmt.module == '__future__'
+            and any(alias.name == 'annotations' for alias in stmt.names)
+            for stmt in self.root.body)
+
+        unevaluated = set()
+        for node in self.finder.find(nf_type=(ast.AnnAssign, ast.FunctionDef,
+                                              ast.AsyncFunctionDef)):
+            if isinstance(node, ast.AnnAssign):
+                annotations = [node.annotation]
+                local = isinstance(node.var_scope, (ast.FunctionDef,
+                                                    ast.AsyncFunctionDef))
+            else:
+                annotations = self._get_annotations(node)
+                local = False
+            if not annotations or (evaluated and not local):
+                continue
+
+            unevaluated.update(get_name_nodes(annotations, loads=True,
+                                              finder=self.finder))
+            if not evaluated:
+                top = node
+                while top.parent is not self.root:
+                    top = top.parent
+                self._annotated.add(top)
+        return unevaluated
+
+    @staticmethod
+    def _get_annotations(function: Union[ast.FunctionDef,
+                                         ast.AsyncFunctionDef]
+                         ) -> List[ast.expr]:
+        """
+        The annotations of a function's arguments and return value.
+        """
+        annotations = [arg.annotation for arg in Parser._get_args(function)
+                       if arg.annotation]
+        if function.returns:
+            annotations.append(function.returns)
+        return annotations
+
+    def dump(self, name: str, methods: List[str] = None,
+             budget: Budget = None) -> str:
         """
         Dump the given object's source code.
+        :param name: The identifier in the global scope.
+        :param methods: If `name` is a class, only keep these methods, along
+            with the methods they reach through `self.`/`cls.` and any special
+            methods. Everything only the other methods depend on is dropped.
+        :param budget: A time limit and/or cancellation token for this dump
+            only, refer to `Budget`.
         :return: The source code as a string
         """
-        log("Dumping `%s`", name)
+        with self._use_budget(budget):
+            line_numbers, _ = self._resolve_name(name, methods)
+            return self._get_code_from_lines(line_numbers)
+
+    def dump_compiled(self, name: str, methods: List[str] = None,
+                      cache: CodeCache = None,
+                      budget: Budget = None) -> CompiledDump:
+        """
+        Dump the given object's source code, and compile it.
+        :param name: The identifier in the global scope.
+        :param methods: Refer to `CodeDumper.dump`.
+        :param cache: A cache to reuse previously compiled dumps from.
+        :param budget: Refer to `CodeDumper.dump`. Compiling isn't covered.
+        :return: The source, its content hash, and the marshal-serialized code
+            object.
+        """
+        source = self.dump(name, methods, budget)
+        if cache is None:
+            return CompiledDump.from_source(source)
+        return cache.compile(source)
+
+    def dump_bundle(self, names: List[str],
+                    methods: Dict[str, List[str]] = None,
+                    budget: Budget = None) -> 'Bundle':
+        """
+        Dump several objects into a single module, where everything they need
+        is included exactly once, in the original order.
+        :param names: The identifiers in the global scope.
+        :param methods: Entry methods to tree-shake class targets with, by
+            name. Refer to `CodeDumper.dump` for details.
+        :param budget: Refer to `CodeDumper.dump`.
+        :return: A Bundle with the source code and its export manifest.
+        """
+        # Find where each export is defined in the bundle. Edits, such as
+        # trimmed imports, can change the number of lines.
+        bundle_lines = {}
+        with self._use_budget(budget):
+            line_numbers, _ = self._resolve_names(names, methods)
+            source = self._get_code_from_lines(line_numbers,
+                                               line_map=bundle_lines)
         root_scp = self.scope_map.get(self.root)
-        if name not in root_scp:
-            raise ValueError("Tried to dump variable `{}` which does not exist "
-                             "in the global scope.".format(name))
+        exports = {}
+        for name in names:
+            definitions = [mv.definition for mv in root_scp.get(name)]
+            exports[name] = sorted(bundle_lines[d.lineno] for d in definitions
+                                   if d.lineno in bundle_lines)
+        return Bundle(source, exports)
 
-        var = root_scp.get(name)
+    def dump_lazy(self, name: str, methods: List[str] = None,
+                  budget: Budget = None) -> LazyImportDump:
+        """
+        Dump the given object's source code, moving the imports that are only
+        used inside function bodies into those bodies. Loading the dump then
+        skips them until the functions run. Refer to `LazyImportPlanner` for
+        the imports that stay where they are.
+        :param name: The identifier in the global scope.
+        :param methods: Refer to `CodeDumper.dump`.
+        :param budget: Refer to `CodeDumper.dump`.
+        :return: A LazyImportDump with the source code and the moved imports.
+        """
+        with self._use_budget(budget):
+            line_numbers, _ = self._resolve_name(name, methods)
+            trimmer = ImportTrimmer(self, line_numbers)
+            edits, moved, eager = LazyImportPlanner(self, line_numbers,
+                                                    trimmer).plan()
+            return LazyImportDump(
+                self._get_code_from_lines(line_numbers, edits), moved, eager)
 
-        line_numbers = set()
-        loaded = []
+    def dump_all(self, names: List[str] = None,
+                 budget: Budget = None) -> Dict[str, str]:
+        """
+        Dump several objects separately, resolving them all together. Refer
+        to `CodeDumper.resolve_all`.
+        :param names: The identifiers in the global scope. Defaults to every
+            dumpable name.
+        :param budget: A time limit and/or cancellation token for all of the
+            dumps together, refer to `Budget`.
+        :return: The source code of each name's dump, by name.
+        """
+        with self._use_budget(budget):
+            closures = self.resolve_all(names)
+            return {name: self._get_code_from_lines(line_numbers)
+                    for name, line_numbers in closures.items()}
 
-        for mv in var:
-            loaded.append(mv)
-            target = mv.definition
-            self.parser.parse_target(target)
-            line_numbers.update(self._resolve_stmt_dependencies(target, loaded))
+    def resolve_all(self, names: List[str] = None,
+                    budget: Budget = None) -> Dict[str, Set[int]]:
+        """
+        Resolve everything each of several root-scope names needs, with the
+        same results as resolving them one by one. The dependency graph is
+        walked once for all of them instead of once per name, which makes
+        dumping every name of a large module much faster.
+        :param names: The identifiers in the global scope. Defaults to every
+            dumpable name.
+        :param budget: Refer to `CodeDumper.dump_all`.
+        :return: The necessary line numbers of each name, by name.
+        """
+        if names is None:
+            names = self.get_dumpable_names()
+        root_scp = self.scope_map.get(self.root)
+        for name in names:
+            if name not in root_scp:
+                raise ValueError("Tried to dump variable `{}` which does not "
+                                 "exist in the global scope.".format(name))
+
+        with self._use_budget(budget):
+            if self.splitter:
+                # The closures of statements depend on the blocks around them.
+                return {name: self._resolve_name(name)[0] for name in names}
+            with self.hooks.phase('resolve'):
+                index = ClosureIndex(self, names)
+                return {name: index.get_closure(name) for name in names}
+
+    def fingerprint(self, name: str, methods: List[str] = None,
+                    budget: Budget = None) -> str:
+        """
+        Get a stable hash of everything a dump of `name` would include,
+        without producing the dump. It's built from the normalized ASTs of the
+        included statements, so formatting and comments don't affect it.
+        :param name: The identifier in the global scope.
+        :param methods: Refer to `CodeDumper.dump`.
+        :param budget: Refer to `CodeDumper.dump`.
+        :return: The fingerprint as a hex string.
+        """
+        with self._use_budget(budget):
+            line_numbers, _ = self._resolve_name(name, methods)
+        fingerprint = hashlib.sha256()
+        for stmt in self.root.body:
+            if stmt.lineno in line_numbers:
+                fingerprint.update(
+                    self._get_stmt_hash(stmt, line_numbers).encode('ascii'))
+        return fingerprint.hexdigest()
+
+    def _get_stmt_hash(self, stmt: ast.stmt, line_numbers: Set[int]) -> str:
+        """
+        Hash the normalized AST of a root-level statement. A tree-shaken class
+        is hashed from its header and the included members.
+        """
+        if isinstance(stmt, ast.ClassDef):
+            members = [m for m in stmt.body if m.lineno in line_numbers]
+            if len(members) != len(stmt.body):
+                partial = hashlib.sha256(
+                    self._get_node_hash(('header', stmt)).encode('ascii'))
+                for member in members:
+                    partial.update(
+                        self._get_node_hash(member).encode('ascii'))
+                return partial.hexdigest()
 
-        return self._get_code_from_lines(line_numbers)
+        return self._get_node_hash(stmt)
 
-    def _resolve_stmt_dependencies(self, stmt: ast.stmt, loaded: list = None,
-                                   depth=0) -> Set[int]:
+    def _get_node_hash(self, key) -> str:
+        """
+        Hash the normalized AST of a statement, or with the key
+        ('header', cls), of a class without its body.
+        """
+        if key not in self._stmt_hashes:
+            if isinstance(key, tuple):
+                _, cls = key
+                node = ast.ClassDef(
+                    name=cls.name, bases=cls.bases, keywords=cls.keywords,
+                    body=[], decorator_list=cls.decorator_list)
+            else:
+                node = key
+            self._stmt_hashes[key] = hashlib.sha256(
+                ast.dump(node).encode('utf-8')).hexdigest()
+        return self._stmt_hashes[key]
+
+    def _resolve_name(self, name: str,
+                      methods: List[str] = None) -> Tuple[Set[int], set]:
+        """
+        Resolve everything a root-scope name needs in order to execute.
+        :param name: The identifier in the global scope.
+        :param methods: Entry methods to tree-shake a class target with. Refer
+            to `CodeDumper.dump` for details.
+        :return: The necessary line numbers, and every statement and
+            MemoryVariable that was loaded along the way.
+        """
+        return self._resolve_names(
+            [name], None if methods is None else {name: methods})
+
+    def _resolve_names(self, names: List[str],
+                       methods: Dict[str, List[str]] = None
+                       ) -> Tuple[Set[int], set]:
+        """
+        Resolve the union of everything several root-scope names need, in a
+        single pass that loads each dependency once.
+        :param names: The identifiers in the global scope.
+        :param methods: Entry methods to tree-shake class targets with, by
+            name.
+        :return: The necessary line numbers, and every statement and
+            MemoryVariable that was loaded along the way.
+        """
+        root_scp = self.scope_map.get(self.root)
+        for name in names:
+            if name not in root_scp:
+                raise ValueError("Tried to dump variable `{}` which does not "
+                                 "exist in the global scope.".format(name))
+
+        with self.hooks.phase('resolve'):
+            # Per-dump resolution state, never shared between dumps.
+            line_numbers = set()
+            loaded = set()
+            shaken = {}
+
+            for name, entry_methods in (methods or {}).items():
+                for mv in root_scp.get(name):
+                    target = mv.definition
+                    if not isinstance(target, ast.ClassDef):
+                        raise ValueError("Can only select methods of a "
+                                         "class, `{}` is not one."
+                                         .format(name))
+                    if target.parent_block:
+                        # Only the class needs to be cut down, not the block
+                        # it's defined in, so keep nested classes whole.
+                        log("Not tree-shaking `%s` inside a block", name)
+                        continue
+                    shaken[target] = self._get_live_members(target,
+                                                            entry_methods)
+
+            for name in names:
+                log("Dumping `%s`", name)
+                for mv in root_scp.get(name):
+                    loaded.add(mv)
+                    target = mv.definition
+                    line_numbers.update(
+                        self._resolve_stmt_dependencies(target, loaded,
+                                                        shaken=shaken))
+
+        return line_numbers, loaded
+
+    def _get_live_members(self, cls: ast.ClassDef,
+                          entry_methods: List[str]) -> Set[ast.stmt]:
+        """
+        Find the statements of a class body that are reachable from the entry
+        methods. Methods reach each other through attributes of their first
+        argument (`self.`/`cls.`) or of the class name. Special methods are
+        called implicitly, so they're always reachable, and so is every
+        statement that isn't a method.
+        :param cls: The class to tree-shake.
+        :param entry_methods: The names of the methods to start from.
+        :return: The live statements of `cls.body`.
+        """
+        methods = defaultdict(list)
+        members = set()
+        for stmt in cls.body:
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                methods[stmt.name].append(stmt)
+            else:
+                members.add(stmt)
+
+        missing = [m for m in entry_methods if m not in methods]
+        if missing:
+            raise ValueError("Class `{}` has no method(s) {}."
+                             .format(cls.name, ', '.join(missing)))
+
+        pending = list(entry_methods)
+        pending.extend(m for m in methods
+                       if m.startswith('__') and m.endswith('__'))
+        live = set()
+        while pending:
+            method_name = pending.pop()
+            if method_name in live:
+                continue
+            live.add(method_name)
+
+            for method in methods[method_name]:
+                receivers = {cls.name, self._get_first_arg(method)}
+                for receiver, attr in self._get_attribute_accesses(method):
+                    if receiver in receivers and attr in methods:
+                        pending.append(attr)
+
+        log("Keeping methods of `%s`: %s", cls.name, sorted(live))
+        members.update(m for name in live for m in methods[name])
+        return members
+
+    @staticmethod
+    def _get_first_arg(method: Union[ast.FunctionDef,
+                                     ast.AsyncFunctionDef]) -> str:
+        """
+        The name of a method's first argument, or None if it has none.
+        """
+        if hasattr(method, 'first_arg'):
+            # Kept by `compact`.
+            return method.first_arg
+        args = [*getattr(method.args, 'posonlyargs', []), *method.args.args]
+        return args[0].arg if args else None
+
+    def _get_attribute_accesses(self, node: ast.AST) -> Set[Tuple[str, str]]:
+        """
+        Find the attributes accessed directly on a name within `node`.
+        :return: A set of (name, attribute) pairs, e.g. ('self', 'x').
+        """
+        if hasattr(node, 'attribute_accesses'):
+            # Kept by `compact`.
+            return node.attribute_accesses
+        return {(attr.value.id, attr.attr)
+                for attr in self.finder.find(nf_type=ast.Attribute,
+                                             nf_root=node)
+                if isinstance(attr.value, ast.Name)}
+
+    @staticmethod
+    def _has_docstring(function: Union[ast.FunctionDef,
+                                       ast.AsyncFunctionDef]) -> bool:
+        """
+        Whether the body of a function starts with a docstring.
+        """
+        if hasattr(function, 'has_docstring'):
+            # Kept by `compact`.
+            return function.has_docstring
+        return ast.get_docstring(function, clean=False) is not None
+
+    @staticmethod
+    def _get_decorating_functions(stmt: ast.stmt) -> List[ast.stmt]:
+        """
+        Get the functions that decorate a function or class, by name or
+        through a call to them. They're called where the statement runs.
+        """
+        if hasattr(stmt, 'decorating_functions'):
+            # Kept by `compact`.
+            return stmt.decorating_functions
+        names = set()
+        for decorator in getattr(stmt, 'decorator_list', ()):
+            if isinstance(decorator, ast.Call):
+                decorator = decorator.func
+            if isinstance(decorator, ast.Name):
+                names.add(decorator.id)
+
+        # Decorators are resolved as dependencies of the statement itself.
+        functions = []
+        for dep in stmt.dependencies:
+            if isinstance(dep, VariableReference) and dep.name in names:
+                functions.extend(
+                    mv.definition for mv in dep
+                    if isinstance(mv.definition, (ast.FunctionDef,
+                                                  ast.AsyncFunctionDef)))
+        return functions
+
+    def get_dumpable_names(self) -> List[str]:
+        """
+        Get every root-scope name that can be dumped, i.e. the ones defined
+        only by functions and classes.
+        :return: The names, in definition order.
+        """
+        names = []
+        for name, ref in list(self.scope_map.get(self.root).items()):
+            definitions = [mv.definition for mv in ref]
+            if definitions and all(isinstance(d, variable_scope_nodes)
+                                   for d in definitions):
+                names.append(name)
+        return names
+
+    def build_reverse_index(self):
+        """
+        Map each statement, MemoryVariable and line number back to the
+        dumpable root-scope names whose dumps include it. Refer to
+        `ClosureIndex.get_dependents`, which does it in a single pass over the
+        dependency graph.
+        """
+        names = self.get_dumpable_names()
+        if self.splitter:
+            # The closures of statements depend on the blocks around them.
+            dependents = defaultdict(set)
+            line_dependents = defaultdict(set)
+            for name in names:
+                line_numbers, loaded = self._resolve_name(name)
+                for item in loaded:
+                    dependents[item].add(name)
+                for line_number in line_numbers:
+                    line_dependents[line_number].add(name)
+        else:
+            with self.hooks.phase('resolve'):
+                dependents, line_dependents = \
+                    ClosureIndex(self, names).get_dependents()
+
+        self._line_dependents = line_dependents
+        self._dependents = dependents
+
+    def get_dependents(self, target: Union[ast.stmt, MemoryVariable,
+                                           int, str]) -> Set[str]:
+        """
+        Find the root-scope names whose dumps include `target`. The reverse
+        index is built on first use.
+        :param target: A statement, a MemoryVariable, a line number, or the
+            qualified name of a function/class.
+        :return: The set of names that depend on the target.
+        """
+        with self._reverse_index_lock:
+            if self._dependents is None:
+                self.build_reverse_index()
+
+        if isinstance(target, str):
+            qualname = target
+            target = self._find_by_qualname(qualname)
+            if target is None:
+                raise ValueError("Could not find a function or class with "
+                                 "qualified name `{}`.".format(qualname))
+
+        if isinstance(target, MemoryVariable):
+            return set(self._dependents.get(target, ()))
+        if isinstance(target, int):
+            return set(self._line_dependents.get(target, ()))
+        if isinstance(target, ast.stmt):
+            # A statement is also included whenever its enclosing block is.
+            return (self._dependents.get(target, set()) |
+                    self._line_dependents.get(target.lineno, set()))
+
+        raise TypeError("Can't look up dependents of type {}."
+                        .format(type(target)))
+
+    def _resolve_stmt_dependencies(self, stmt: ast.stmt, loaded: set = None,
+                                   depth=0, shaken: dict = None) -> Set[int]:
         """
         Recursively load all dependencies that `stmt` needs in order to execute.
         :param stmt: The target statement.
-        :param loaded: List of dependencies that have already been loaded.
+        :param loaded: Set of dependencies that have already been loaded.
         :param depth: Recursion depth, used for logging.
+        :param shaken: Classes being tree-shaken, mapped to the members of
+            their body that are kept.
         :return: A set of the necessary line numbers.
         """
-        loaded = loaded or []
+        loaded = set() if loaded is None else loaded
+        shaken = shaken or {}
         name = stmt
         if isinstance(stmt, variable_scope_nodes):
             name = f"`{stmt.qualname}`"
@@ -116,55 +809,109 @@ class CodeDumper:
             log('Skipping L%d: %s', stmt.lineno, name, depth=depth)
             return log_return(set(), depth)
 
-        loaded.append(stmt)
+        loaded.add(stmt)
         log('Loading L%d: %s', stmt.lineno, name, depth=depth)
+        if self.hooks:
+            self.hooks.statement_loaded(stmt, stmt.lineno, depth)
 
-        # Add this statement's parent block's line numbers.
-        pb = stmt
-        while pb.parent_block:
-            pb = pb.parent_block
-        line_numbers = set(range(*self._get_line_interval(pb)))
+        blocks = None
+        if stmt in shaken:
+            # Only the header and the kept members of a tree-shaken class.
+            line_numbers = self._get_class_header_lines(stmt)
+            nodes = [stmt]
+            for child in ast.iter_child_nodes(stmt):
+                if child not in stmt.body or child in shaken[stmt]:
+                    nodes.extend(ast.walk(child))
+            for member in shaken[stmt]:
+                line_numbers.update(self._get_member_lines(stmt, member))
+        else:
+            # Add this statement's parent block's line numbers. Stop at the
+            # members of tree-shaken classes, which are included separately.
+            pb = stmt
+            while pb.parent_block and pb.parent_block not in shaken:
+                pb = pb.parent_block
+            unit, blocks = (self.splitter.split(stmt, shaken)
+                            if self.splitter else (stmt, []))
+            if blocks:
+                # Only the statement and the headers of the blocks around it,
+                # followed by the lines up to the next statement.
+                pb = blocks[-1][0]
+                line_numbers = self.splitter.get_lines(unit, blocks)
+                line_numbers.update(range(pb.end_lineno + 1,
+                                          self._get_line_interval(pb)[1]))
+                nodes = ast.walk(unit) if unit else ()
+            else:
+                line_numbers = set(range(*self._get_line_interval(pb)))
+                nodes = ast.walk(stmt)
+            if pb.parent_block:
+                line_numbers.update(
+                    self._get_class_header_lines(pb.parent_block))
 
         refs = set()
-        for n in ast.walk(stmt):
+        for n in nodes:
             # Include only the resolved VariableReferences.
             refs.update(dep for dep in n.dependencies
                         if isinstance(dep, VariableReference))
+        if blocks:
+            for block, _ in blocks:
+                refs.update(dep for dep in block.header_dependencies
+                            if isinstance(dep, VariableReference))
+            for other in self.splitter.get_statements(unit, blocks):
+                line_numbers.update(
+                    self._resolve_stmt_dependencies(other, loaded, depth + 1,
+                                                    shaken))
 
         variables = set(mv for ref in refs for mv in ref)
         for variable in variables:
             line_numbers.update(
                 self._resolve_variable_dependencies(variable, loaded,
-                                                    depth + 1))
+                                                    depth + 1, shaken))
 
         return log_return(line_numbers, depth)
 
     def _resolve_variable_dependencies(self, mv: MemoryVariable,
-                                       loaded: list = None,
-                                       depth=0) -> Set[int]:
+                                       loaded: set = None, depth=0,
+                                       shaken: dict = None) -> Set[int]:
         """
         Recursively load all dependencies that mv needs in order to exist.
         :param mv: The target MemoryVariable.
-        :param loaded: List of dependencies that have already been loaded.
+        :param loaded: Set of dependencies that have already been loaded.
         :param depth: Recursion depth, used for logging.
+        :param shaken: Refer to `_resolve_stmt_dependencies`.
         :return: A set of the necessary line numbers.
         """
-        loaded = loaded or []
+        loaded = set() if loaded is None else loaded
         if mv in loaded:
             log('Skipping variable %s', mv, depth=depth)
             return log_return(set(), depth)
 
-        loaded.append(mv)
+        loaded.add(mv)
         log('Loading variable %s', mv, depth=depth)
+        if self.hooks:
+            self.hooks.variable_loaded(mv, depth)
 
         line_numbers = set()
         for stmt in mv:
+            if not self.parser.runs_on_import(stmt):
+                continue
             # Fetch the parent block for importing.
             line_numbers.update(
-                self._resolve_stmt_dependencies(stmt, loaded, depth + 1))
+                self._resolve_stmt_dependencies(stmt, loaded, depth + 1,
+                                                shaken))
 
         return log_return(line_numbers, depth)
 
+    def _find_by_qualname(self, qualname: str) -> ast.stmt:
+        """
+        Find the first function or class with the qualified name, or None.
+        """
+        if self._qualnames is None:
+            qualnames = {}
+            for node in self.finder.find(nf_type=variable_scope_nodes):
+                qualnames.setdefault(node.qualname, node)
+            self._qualnames = qualnames
+        return self._qualnames.get(qualname)
+
     def _get_line_interval(self, target: ast.AST,
                            from_lineno: int = None) -> (int, int):
         """
@@ -173,6 +920,9 @@ class CodeDumper:
         :param target: The node to traverse.
         :return: The lowest and highest line numbers.
         """
+        if from_lineno is None and hasattr(target, 'line_interval'):
+            # Kept by `compact`.
+            return target.line_interval
         sorted_siblings = sorted(
             filter(lambda x: hasattr(x, 'lineno'),
                    ast.iter_child_nodes(target.parent)),
@@ -188,20 +938,95 @@ class CodeDumper:
                 return from_lineno, len(self.source) + 1
             return self._get_line_interval(target.parent, from_lineno)
 
-    def _get_code_from_lines(self, line_numbers: Set[int]) -> str:
+    @staticmethod
+    def _get_first_lineno(stmt: ast.stmt) -> int:
+        """
+        The first line of a statement, including its decorators.
+        """
+        if hasattr(stmt, 'first_lineno'):
+            # Kept by `compact`.
+            return stmt.first_lineno
+        decorators = getattr(stmt, 'decorator_list', [])
+        return min([stmt.lineno, *(d.lineno for d in decorators)])
+
+    def _get_class_header_lines(self, cls: ast.ClassDef) -> Set[int]:
+        """
+        The lines of a class definition before its first body statement.
+        """
+        return set(range(cls.lineno, self._get_first_lineno(cls.body[0])))
+
+    def _get_member_lines(self, cls: ast.ClassDef, member: ast.stmt) -> range:
+        """
+        The lines of a statement in a class body, including its decorators,
+        up to the start of the next statement (or of the class's next sibling).
+        """
+        index = cls.body.index(member)
+        if index + 1 < len(cls.body):
+            end = self._get_first_lineno(cls.body[index + 1])
+        else:
+            _, end = self._get_line_interval(cls)
+        return range(self._get_first_lineno(member), end)
+
+    def _get_code_from_lines(self, line_numbers: Set[int],
+                             edits: Dict[int, List[str]] = None,
+                             line_map: Dict[int, int] = None) -> str:
         """
         Convert the given line numbers into the corresponding lines of code.
         :param line_numbers: The line numbers to get
+        :param edits: Lines to replace, mapped to the lines that replace
+            them, with their original indentation. Defaults to trimming the
+            imports to the aliases that are used, refer to `ImportTrimmer`.
+        :param line_map: If given, filled with the line numbers in the
+            output that the given lines start at, by their original line
+            number. Lines that are edited out aren't included.
         :return: The corresponding lines from the code, with common indents
             removed.
         """
-        # Sort the line numbers
-        lines = sorted(list(line_numbers))
-        # Get the lines
-        code = [self.source[idx - 1] for idx in lines]
-        # Strip the common indent from the start of all lines.
-        common_indent = min(len(line) - len(line.lstrip())
-                            for line in code if not line.isspace())
-        trimmed_lines = (line[common_indent:] for line in code)
-        # Join into a single string
-        return '\n'.join(trimmed_lines)
+        with self.hooks.phase('emit'):
+            if edits is None:
+                edits = ImportTrimmer(self, line_numbers).get_edits()
+            if self.splitter:
+                edits = {**self.splitter.get_edits(line_numbers), **edits}
+            code = []
+            if any(stmt.lineno in line_numbers for stmt in self._annotated):
+                # The dropped annotations would fail if they were evaluated.
+                code.append('from __future__ import annotations')
+                first = self.source[min(line_numbers) - 1]
+                if not first.startswith(('import ', 'from ')):
+                    # Set it apart from the code, like imports usually are.
+                    code.extend(('', ''))
+            # Sort the line numbers
+            lines = sorted(list(line_numbers))
+            # Get the lines
+            if edits or line_map is not None:
+                for idx in lines:
+                    replacement = edits.get(idx, (self.source[idx - 1],))
+                    if line_map is not None and replacement:
+                        line_map[idx] = len(code) + 1
+                    code.extend(replacement)
+            else:
+                code.extend(self.source[idx - 1] for idx in lines)
+            # Strip the common indent from the start of all lines.
+            common_indent = min(len(line) - len(line.lstrip())
+                                for line in code if not line.isspace())
+            trimmed_lines = (line[common_indent:] for line in code)
+            # Join into a single string
+            return '\n'.join(trimmed_lines)
+
+
+class Bundle:
+    """
+    A single module containing several dumped objects.
+    """
+
+    def __init__(self, source: str, exports: Dict[str, List[int]]):
+        """
+        :param source: The source code of the bundle.
+        :param exports: The manifest of the dumped names, mapped to the
+            line numbers in `source` where they are defined.
+        """
+        self.source = source
+        self.exports = exports
+
+    def __str__(self):
+        return self.source
@@ -1,14 +1,32 @@
 import ast
+from bisect import bisect_left
+from heapq import merge
+from operator import attrgetter
+from typing import Callable
 
 from code_dumper.types import T
 
+# The default root of `NodeFinder.find`, so that a root of None isn't taken
+# to mean the whole tree.
+_TREE_ROOT = object()
+
 
 class NodeFinder:
     """
     A query engine for Abstract Syntax Trees to make life easier when trying
     to find nodes.
+
+    On the first query, the tree is flattened into pre-order and indexed by
+    node type. Every node then owns a contiguous range of that ordering (its
+    subtree), so a query only has to look at the nodes of the requested types
+    that fall within the range of `nf_root`, instead of walking everything.
     """
 
+    # Compiled type-only predicates, keyed by type. Shared across instances
+    # since a predicate doesn't depend on the tree it's used on. Queries with
+    # properties aren't cached, their values are unbounded.
+    _predicates = {}
+
     def __init__(self, node: ast.AST):
         """
         Instantiate a new NodeFinder with `node` as the root node.
@@ -16,6 +34,12 @@ class NodeFinder:
         """
         self.node = node
 
+        # Built lazily by `_build_index`.
+        self._order = None
+        self._spans = None
+        self._by_type = None
+        self._type_cache = {}
+
     @staticmethod
     def matches(node, nf_type: T.NodeTupleOrNode = None, **properties) -> bool:
         """
@@ -33,22 +57,136 @@ class NodeFinder:
                     -> does not work
         :return: Whether the node matches the requirements.
         """
-        if nf_type and not isinstance(node, nf_type):
-            return False
+        return NodeFinder.compile(nf_type, **properties)(node)
 
-        # Test every property
+    @staticmethod
+    def compile(nf_type: T.NodeTupleOrNode = None,
+                **properties) -> Callable[[ast.AST], bool]:
+        """
+        Compile a query into a predicate equivalent to `NodeFinder.matches`
+        with the same arguments. Only type-only predicates are cached, so hot
+        loops should compile once and call the result for every node.
+        :param nf_type: The desired node type.
+        :param properties: kwargs containing the properties to be tested.
+        :return: A function taking a node and returning whether it matches.
+        """
+        if properties:
+            return NodeFinder._build_predicate(nf_type, properties)
+        try:
+            return NodeFinder._predicates[nf_type]
+        except KeyError:
+            predicate = NodeFinder._build_predicate(nf_type, properties)
+            NodeFinder._predicates[nf_type] = predicate
+            return predicate
+
+    @staticmethod
+    def _build_predicate(nf_type, properties) -> Callable[[ast.AST], bool]:
+        """
+        Build a specialized predicate for the query, with the type check and
+        each property test resolved ahead of time.
+        """
+        checks = []
         for attr, target in properties.items():
-            if attr == 'ctx' and type(getattr(node, attr)) == target:
-                continue
-            if target != getattr(node, attr):
-                return False
-        return True
-
-    def find(self, nf_type: T.NodeTupleOrNode = None, nf_root: ast.AST = None,
-             nf_ignore_root=False, **properties):
+            get = attrgetter(attr)
+            if attr == 'ctx':
+                # `ctx` is compared by type, see `NodeFinder.matches`.
+                checks.append(lambda node, get=get, target=target:
+                              type(get(node)) == target or target == get(node))
+            else:
+                checks.append(lambda node, get=get, target=target:
+                              target == get(node))
+
+        if not nf_type:
+            return lambda node: all(check(node) for check in checks)
+        if not checks:
+            return lambda node: isinstance(node, nf_type)
+        if len(checks) == 1:
+            check = checks[0]
+            return lambda node: isinstance(node, nf_type) and check(node)
+        return lambda node: (isinstance(node, nf_type) and
+                             all(check(node) for check in checks))
+
+    def _build_index(self):
+        """
+        Flatten the tree into pre-order, recording the range of positions that
+        each node's subtree covers and the positions of every node type.
+        """
+        order = []
+        parents = []
+        by_type = {}
+
+        stack = [(self.node, -1)]
+        while stack:
+            node, parent = stack.pop()
+            position = len(order)
+            order.append(node)
+            parents.append(parent)
+            by_type.setdefault(type(node), []).append(position)
+
+            # Same as ast.iter_child_nodes, but without the generator overhead.
+            children = []
+            for field in node._fields:
+                value = getattr(node, field, None)
+                if isinstance(value, ast.AST):
+                    children.append(value)
+                elif isinstance(value, list):
+                    children.extend(child for child in value
+                                    if isinstance(child, ast.AST))
+            stack.extend((child, position) for child in reversed(children))
+
+        # A subtree is contiguous in pre-order, so its range is the position
+        # of its root plus the number of nodes in it.
+        sizes = [1] * len(order)
+        for position in range(len(order) - 1, 0, -1):
+            sizes[parents[position]] += sizes[position]
+
+        self._order = order
+        self._spans = {node: (position, position + sizes[position])
+                       for position, node in enumerate(order)}
+        self._by_type = by_type
+
+    def _positions_for_type(self, nf_type: T.NodeTupleOrNode):
+        """
+        Get the sorted position lists of every indexed node type that is an
+        instance of `nf_type`.
+        :param nf_type: The requested node type(s).
+        :return: A list of sorted position lists.
+        """
+        if nf_type not in self._type_cache:
+            self._type_cache[nf_type] = [
+                positions for type_, positions in self._by_type.items()
+                if issubclass(type_, nf_type)]
+        return self._type_cache[nf_type]
+
+    def _find_indexed(self, nf_type, nf_root, nf_ignore_root, properties):
+        start, end = self._spans[nf_root]
+        if nf_ignore_root:
+            start += 1
+
+        if nf_type:
+            ranges = []
+            for positions in self._positions_for_type(nf_type):
+                lo = bisect_left(positions, start)
+                hi = bisect_left(positions, end, lo)
+                if lo != hi:
+                    ranges.append(positions[lo:hi])
+            # Each type's positions are sorted, merge them to keep pre-order.
+            positions = ranges[0] if len(ranges) == 1 else merge(*ranges)
+            candidates = map(self._order.__getitem__, positions)
+        else:
+            candidates = self._order[start:end]
+
+        if properties:
+            candidates = filter(self.compile(**properties), candidates)
+        yield from candidates
+
+    def find(self, nf_type: T.NodeTupleOrNode = None,
+             nf_root: ast.AST = _TREE_ROOT, nf_ignore_root=False,
+             **properties):
         """
         Find all nodes matching the provided properties. Refer to
         `NodeFinder.matches` for a description of the property arguments.
+        Results are returned in pre-order.
         :param nf_type: Target node type.
         :param nf_root: Root node to start search from, optional. If not
             provided, self.node is used as the search root.
@@ -56,11 +194,26 @@ class NodeFinder:
             search results.
         :param properties: The properties to match.
         :return: A generator returning the matching elements.
+        :raises ValueError: If `nf_root` is None.
         """
-        nf_root = nf_root or self.node
+        if nf_root is None:
+            raise ValueError("Can't search from a root of None.")
+        if nf_root is _TREE_ROOT:
+            nf_root = self.node
+        if self._order is None:
+            self._build_index()
+
+        if nf_root in self._spans:
+            return self._find_indexed(nf_type, nf_root, nf_ignore_root,
+                                      properties)
+        # The root isn't part of the indexed tree, fall back to a full walk.
+        return self._find_walk(nf_type, nf_root, nf_ignore_root, properties)
+
+    def _find_walk(self, nf_type, nf_root, nf_ignore_root, properties):
+        predicate = self.compile(nf_type, **properties)
         for node in ast.walk(nf_root):
             if nf_ignore_root and node == nf_root:
                 continue  # skip self
 
-            if self.matches(node, nf_type, **properties):
+            if predicate(node):
                 yield node
@@ -1,10 +1,9 @@
 import ast
 import inspect
-import itertools
 import logging
+import sys
 import types
-
-from IPython import get_ipython
+from typing import List
 
 from code_dumper.finder import NodeFinder
 
@@ -38,36 +37,57 @@ class DefaultDictWithKey(dict):
         return self[key]
 
 
-def get_name_nodes(root, loads=False, stores=False,
-                   dels=False, ignore_root=False):
+def iter_name_nodes(root, loads=False, stores=False,
+                    dels=False, ignore_root=False, finder: NodeFinder = None):
     """
-    Get all sub-nodes of type ast.Name.
-    :param root: Root to start the search from.
+    Lazily get all sub-nodes of type ast.Name, in a single traversal for all
+    the requested contexts. Nothing is collected, so stopping after the first
+    match costs only the nodes visited up to it.
+    :param root: Root to start the search from, or a list of roots.
     :param loads: Whether to include ctx=ast.Load.
     :param stores: Whether to include ctx=ast.Store.
     :param dels: Whether to include ctx=ast.Del.
     :param ignore_root: Whether to include the root node in the results.
+    :param finder: An existing NodeFinder for the tree `root` belongs to, so
+        its index can be reused. If not provided, the tree is walked.
     :return: Generator that returns the matched nodes.
+    :raises ValueError: If a root is None.
     """
-    try:
-        iter(root)
-        return itertools.chain(
-            *[get_name_nodes(r, loads, stores, dels, ignore_root)
-              for r in root]
-        )
-    except TypeError:
-        ...
-
     ctxs = (
         *((ast.Load,) if loads else tuple()),
         *((ast.Store,) if stores else tuple()),
         *((ast.Del,) if dels else tuple())
     )
-    finder = NodeFinder(root)
-    return itertools.chain(
-        *[finder.find(nf_type=ast.Name, nf_ignore_root=ignore_root, ctx=ctx)
-          for ctx in ctxs]
-    )
+    if not ctxs:
+        return
+
+    roots = root if isinstance(root, (list, tuple)) else (root,)
+    for root_ in roots:
+        if root_ is None:
+            raise ValueError("Can't search from a root of None.")
+        if finder:
+            candidates = finder.find(nf_type=ast.Name, nf_root=root_,
+                                     nf_ignore_root=ignore_root)
+        else:
+            candidates = ast.walk(root_)
+            if ignore_root:
+                next(candidates)  # skip self
+
+        for node in candidates:
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ctxs):
+                yield node
+
+
+def get_name_nodes(root, loads=False, stores=False,
+                   dels=False, ignore_root=False,
+                   finder: NodeFinder = None) -> List[ast.Name]:
+    """
+    Get all sub-nodes of type ast.Name. Refer to `iter_name_nodes` for a
+    description of the arguments.
+    :return: List of the matched nodes.
+    """
+    return list(iter_name_nodes(root, loads, stores, dels, ignore_root,
+                                finder))
 
 
 def can_be_parsed(cell):
@@ -90,7 +110,13 @@ def get_source_from_obj(obj):
     :param obj: The target object to be dumped.
     :return: All the source lines from the environment.
     """
-    kernel = get_ipython()
+    # A kernel can only be running if IPython has been imported, and IPython
+    # is slow to import.
+    kernel = None
+    if 'IPython' in sys.modules:
+        from IPython import get_ipython
+        kernel = get_ipython()
+
     if kernel:
         # Use _ih to get all code run in the kernel.
         # Not using kernel.ev('_ih') because we don't want to modify the input
@@ -100,9 +126,21 @@ def get_source_from_obj(obj):
         filtered_history = filter(can_be_parsed, all_history)
         source = '\n# ---\n'.join(filtered_history)
     else:
-        # Use `inspect` to get all the source code of the module.
-        mod = inspect.getmodule(obj)
-        source = inspect.getsource(mod)
+        from code_dumper.sources import Source, get_module_source
+
+        # Look the module up by name, `inspect.getmodule` is only needed when
+        # the object doesn't say where it's from.
+        name = getattr(obj, '__module__', None)
+        mod = sys.modules.get(name) if name else None
+        if mod is None:
+            mod = inspect.getmodule(obj)
+            name = getattr(mod, '__name__', name)
+
+        source = get_module_source(name, mod)
+        if source is None:
+            # Fall back to `inspect`, which can find the source of some more
+            # unusual modules.
+            source = Source(inspect.getsource(mod))
     return source
 
 
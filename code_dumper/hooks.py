@@ -0,0 +1,198 @@
+import ast
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List
+
+from code_dumper.memory import MemoryVariable
+
+
+class Hook:
+    """
+    Callbacks into the analysis and the dumps, for profiling and tracing.
+    Subclass it and override the events of interest, every one of them does
+    nothing by default.
+
+    Hooks attached to a CodeDumper are called from whichever thread dumps, so
+    they have to be thread-safe if the CodeDumper is shared.
+    """
+
+    def phase_start(self, phase: str):
+        """
+        A phase of the analysis or of a dump started. The analysis runs the
+        phases "ast", "attributes", "dependencies", "parser" and "targets",
+        every dump runs "resolve" and "emit". `CodeDumper.compact` runs
+        "compact".
+        """
+
+    def phase_end(self, phase: str):
+        """
+        A phase finished, refer to `Hook.phase_start`.
+        """
+
+    def statement_parsed(self, stmt: ast.stmt, lineno: int, depth: int):
+        """
+        The parser parsed a statement.
+        :param stmt: The statement.
+        :param lineno: Its line number.
+        :param depth: How many function bodies are being parsed.
+        """
+
+    def variable_allocated(self, mv: MemoryVariable, name: str,
+                           scope_node: ast.AST):
+        """
+        The parser allocated a new variable.
+        :param mv: The variable.
+        :param name: The identifier it's assigned to.
+        :param scope_node: The node of the scope it's assigned in. False for
+            the external scope.
+        """
+
+    def statement_loaded(self, stmt: ast.stmt, lineno: int, depth: int):
+        """
+        A dump loaded a statement, along with its parent blocks.
+        :param stmt: The statement.
+        :param lineno: Its line number.
+        :param depth: The recursion depth of the dependency resolution.
+        """
+
+    def variable_loaded(self, mv: MemoryVariable, depth: int):
+        """
+        A dump loaded a variable, along with every statement that uses it.
+        :param mv: The variable.
+        :param depth: The recursion depth of the dependency resolution.
+        """
+
+
+class HookList(Hook):
+    """
+    Calls several hooks for every event. It's falsy if it's empty, so that
+    callers can skip preparing an event nobody listens to.
+    """
+
+    def __init__(self, hooks: List[Hook] = None):
+        self.hooks = list(hooks or [])
+
+    def __bool__(self):
+        return bool(self.hooks)
+
+    @contextmanager
+    def phase(self, phase: str):
+        """
+        Run the body as the given phase.
+        """
+        self.phase_start(phase)
+        try:
+            yield
+        finally:
+            self.phase_end(phase)
+
+    def phase_start(self, phase):
+        for hook in self.hooks:
+            hook.phase_start(phase)
+
+    def phase_end(self, phase):
+        for hook in self.hooks:
+            hook.phase_end(phase)
+
+    def statement_parsed(self, stmt, lineno, depth):
+        for hook in self.hooks:
+            hook.statement_parsed(stmt, lineno, depth)
+
+    def variable_allocated(self, mv, name, scope_node):
+        for hook in self.hooks:
+            hook.variable_allocated(mv, name, scope_node)
+
+    def statement_loaded(self, stmt, lineno, depth):
+        for hook in self.hooks:
+            hook.statement_loaded(stmt, lineno, depth)
+
+    def variable_loaded(self, mv, depth):
+        for hook in self.hooks:
+            hook.variable_loaded(mv, depth)
+
+
+class PhaseTimer(Hook):
+    """
+    Add up the wall time spent in every phase, across the analysis and all
+    dumps.
+    """
+
+    def __init__(self):
+        self.totals: Dict[str, float] = defaultdict(float)
+        self._starts = {}
+        self._lock = threading.Lock()
+
+    def phase_start(self, phase):
+        self._starts[threading.get_ident(), phase] = time.perf_counter()
+
+    def phase_end(self, phase):
+        end = time.perf_counter()
+        start = self._starts.pop((threading.get_ident(), phase))
+        with self._lock:
+            self.totals[phase] += end - start
+
+
+class ChromeTraceHook(Hook):
+    """
+    Record every event in the Chrome trace event format, which can be opened
+    in chrome://tracing or Perfetto. Phases show up as spans, everything else
+    as instant events within them.
+    """
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _add(self, name: str, ph: str, cat: str, **args):
+        event = {'name': name, 'cat': cat, 'ph': ph,
+                 'ts': time.perf_counter_ns() / 1000, 'pid': self._pid,
+                 'tid': threading.get_ident()}
+        if ph == 'i':
+            event['s'] = 't'
+        if args:
+            event['args'] = args
+        with self._lock:
+            self.events.append(event)
+
+    def phase_start(self, phase):
+        self._add(phase, 'B', 'phase')
+
+    def phase_end(self, phase):
+        self._add(phase, 'E', 'phase')
+
+    def statement_parsed(self, stmt, lineno, depth):
+        self._add(type(stmt).__name__, 'i', 'parse', lineno=lineno,
+                  depth=depth)
+
+    def variable_allocated(self, mv, name, scope_node):
+        scope = getattr(scope_node, 'qualname', None)
+        if scope is None:
+            scope = '<source>' if scope_node else '<external>'
+        self._add(name, 'i', 'allocate', address=mv.address, scope=scope)
+
+    def statement_loaded(self, stmt, lineno, depth):
+        self._add(type(stmt).__name__, 'i', 'load', lineno=lineno,
+                  depth=depth)
+
+    def variable_loaded(self, mv, depth):
+        self._add(str(mv), 'i', 'load', address=mv.address, depth=depth)
+
+    def to_json(self) -> dict:
+        """
+        Get the trace as a JSON-serializable object.
+        """
+        with self._lock:
+            events = list(self.events)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, path: str):
+        """
+        Write the trace to a file.
+        """
+        with open(path, 'w') as f:
+            json.dump(self.to_json(), f)
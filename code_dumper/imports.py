@@ -0,0 +1,146 @@
+import ast
+from typing import Dict, List, Optional, Set, Tuple
+
+from code_dumper.variables import VariableReference
+
+
+class ImportTrimmer:
+    """
+    Rewrites the import statements of a dump to only the aliases that the
+    dumped code uses, e.g. `from pkg import a, b` to `from pkg import a` if
+    nothing uses `b`.
+
+    The parser records the whole statement as the store of every alias, so
+    the dump includes the statement for any one of them. An alias is used if
+    a dumped statement depends on the variable it binds. Statements that were
+    never parsed only have identifiers, so every alias with one of those
+    names is kept. So is every alias binding the same name as a kept one,
+    since `import a.b, a.c` needs both to load the submodules.
+
+    Only the imports with several aliases can be trimmed. The analysis
+    collects them along with the statements that use their names, refer to
+    `CodeDumper._calculate_node_dependencies`, so a dump only looks at its
+    own imports. The trimmed sources are cached on the analysis.
+    """
+
+    def __init__(self, dumper, line_numbers: Set[int]):
+        """
+        :param dumper: The analysed CodeDumper.
+        :param line_numbers: The lines of the dump.
+        """
+        self.dumper = dumper
+        self.line_numbers = line_numbers
+
+        # The dumped imports that might be trimmed.
+        self.imports: List[ast.stmt] = [
+            stmt for stmt in dumper.multi_imports
+            if stmt.lineno in line_numbers]
+        self._sources: Dict[ast.stmt, Optional[str]] = {}
+
+    def get_source(self, stmt: ast.stmt) -> str:
+        """
+        Get the source of an import with only the used aliases, without the
+        indentation of its first line.
+        """
+        trimmed = self._get_trimmed(stmt)
+        return self._get_original(stmt) if trimmed is None else trimmed
+
+    def _get_trimmed(self, stmt: ast.stmt) -> Optional[str]:
+        if stmt not in self._sources:
+            self._sources[stmt] = self._trim(stmt)
+        return self._sources[stmt]
+
+    def _get_original(self, stmt: ast.stmt) -> str:
+        lines = self.dumper.source[stmt.lineno - 1:stmt.end_lineno]
+        return '\n'.join([lines[0][stmt.col_offset:], *lines[1:]])
+
+    def _trim(self, stmt: ast.stmt) -> Optional[str]:
+        """
+        :return: The trimmed source, or None if every alias is used or the
+            statement can't be rewritten.
+        """
+        # `compact` drops the aliases, so they were collected beforehand.
+        aliases = self.dumper.multi_imports.get(stmt)
+        if aliases is None:
+            return None
+
+        used = {name for name in set(map(self._get_bound_name, aliases))
+                if self._is_used(stmt, name)}
+        kept = tuple(index for index, alias in enumerate(aliases)
+                     if self._get_bound_name(alias) in used)
+        if len(kept) == len(aliases) or not kept:
+            # Nothing to trim, or it's only there for an unparsed statement.
+            return None
+
+        cache = self.dumper.trimmed_imports
+        key = stmt, kept
+        if key not in cache:
+            cache[key] = None if self._shares_lines(stmt) else \
+                self._format(stmt, [aliases[index] for index in kept])
+        return cache[key]
+
+    def _is_used(self, stmt: ast.stmt, name: str) -> bool:
+        """
+        Whether a dumped statement depends on a name that an import binds.
+        """
+        for user in self.dumper.import_users.get(name, ()):
+            if user.lineno not in self.line_numbers:
+                continue
+            for dep in user.dependencies:
+                if isinstance(dep, VariableReference):
+                    if dep.name == name and \
+                            any(mv.definition is stmt for mv in dep):
+                        return True
+                elif (dep if isinstance(dep, str) else dep.id) == name:
+                    # The statement was never parsed.
+                    return True
+        return False
+
+    @staticmethod
+    def _format(stmt: ast.stmt, aliases: List[Tuple[str, Optional[str]]]
+                ) -> str:
+        names = ', '.join(name if asname is None
+                          else '{} as {}'.format(name, asname)
+                          for name, asname in aliases)
+        if isinstance(stmt, ast.Import):
+            return 'import ' + names
+        return 'from {}{} import {}'.format('.' * (stmt.level or 0),
+                                            stmt.module or '', names)
+
+    @staticmethod
+    def _get_bound_name(alias: Tuple[str, Optional[str]]) -> str:
+        # import tensorflow.keras -> name == 'tensorflow'
+        name, asname = alias
+        return (asname or name).split('.')[0]
+
+    @staticmethod
+    def _shares_lines(stmt: ast.stmt) -> bool:
+        """
+        Whether another statement is on the lines of `stmt`, e.g. `import a;
+        b()`.
+        """
+        for field in ('body', 'orelse', 'finalbody'):
+            siblings = getattr(stmt.parent, field, None)
+            if isinstance(siblings, list) and stmt in siblings:
+                index = siblings.index(stmt)
+                return any(s.end_lineno >= stmt.lineno and
+                           s.lineno <= stmt.end_lineno
+                           for s in siblings[max(index - 1, 0):index + 2]
+                           if s is not stmt)
+        return False
+
+    def get_edits(self) -> Dict[int, List[str]]:
+        """
+        Get the line edits that trim the imports, refer to
+        `CodeDumper._get_code_from_lines`.
+        """
+        edits = {}
+        for stmt in self.imports:
+            trimmed = self._get_trimmed(stmt)
+            if trimmed is None:
+                continue
+            first = self.dumper.source[stmt.lineno - 1]
+            edits[stmt.lineno] = [first[:stmt.col_offset] + trimmed]
+            for lineno in range(stmt.lineno + 1, stmt.end_lineno + 1):
+                edits[lineno] = []
+        return edits
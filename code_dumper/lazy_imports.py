@@ -0,0 +1,295 @@
+import ast
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Set
+
+from code_dumper.helpers import log
+from code_dumper.imports import ImportTrimmer
+from code_dumper.memory import MemoryVariable
+from code_dumper.variables import VariableReference
+
+_function_nodes = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+class LazyImportDump:
+    """
+    A dump where the imports that are only used inside function bodies were
+    moved into those bodies, so loading it doesn't import them.
+    """
+
+    def __init__(self, source: str, moved: Dict[str, List[str]],
+                 eager: Set[str]):
+        """
+        :param source: The source code of the dump.
+        :param moved: The modules whose imports were moved, mapped to the
+            qualified names of the functions that now import them.
+        :param eager: The modules that are still imported at load time.
+        """
+        self.source = source
+        self.moved = moved
+        self.eager = eager
+
+    def estimate_savings(self) -> float:
+        """
+        Estimate the import time saved when loading the dump, in seconds. Each
+        moved module is timed on its own in a fresh interpreter, refer to
+        `get_import_time`. Modules that share dependencies are counted in
+        full for each of them, so it's an upper bound.
+        """
+        return sum(get_import_time(module) for module in self.moved
+                   if module not in self.eager)
+
+    def __str__(self):
+        return self.source
+
+
+@lru_cache(maxsize=None)
+def get_import_time(module: str) -> float:
+    """
+    Measure how long importing a module takes, with `python -X importtime`.
+    Modules that the interpreter imports on startup take no time.
+    :param module: The absolute module name.
+    :return: The cumulative import time in seconds, or 0 if it can't be
+        imported here.
+    """
+    try:
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            universal_newlines=True, timeout=60)
+    except (OSError, subprocess.SubprocessError):
+        return 0.
+    if result.returncode:
+        log("Couldn't import `%s` to time it", module)
+        return 0.
+
+    # import time: self [us] | cumulative | imported package
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*(\S+)$',
+                         line)
+        if match and match.group(2) == module:
+            return int(match.group(1)) / 1e6
+    return 0.
+
+
+class LazyImportPlanner:
+    """
+    Finds the root-level imports of a dump that are only used inside function
+    bodies, and moves each of them to the top of the outermost functions that
+    use it.
+
+    Uses come from the resolved dependencies of the dumped statements. An
+    import stays at the root if it's used at load time, including in
+    decorators, the functions that the root calls, default values and class
+    bodies, or where it's unclear:
+    names that are also bound elsewhere, statements that share its lines,
+    functions whose bodies were never parsed or that declare the name
+    `global`, and bodies that start on the `def` line.
+    """
+
+    def __init__(self, dumper, line_numbers: Set[int],
+                 trimmer: ImportTrimmer):
+        """
+        :param dumper: The analysed CodeDumper.
+        :param line_numbers: The lines of the dump.
+        :param trimmer: Trims the imports of the dump, moved ones included.
+        """
+        self.dumper = dumper
+        self.line_numbers = line_numbers
+        self.trimmer = trimmer
+
+        # The variables bound by candidate imports, and their names.
+        self.imports: Dict[MemoryVariable, ast.stmt] = {}
+        self.names: Dict[str, ast.stmt] = {}
+
+        # Where each candidate import is used.
+        self.functions: Dict[ast.stmt, Set[ast.stmt]] = defaultdict(set)
+        self.eager: Set[ast.stmt] = set()
+
+        # The decorators of what the dump defines, which run when it's loaded.
+        self.decorators: Set[ast.stmt] = set()
+
+    def plan(self) -> (Dict[int, List[str]], Dict[str, List[str]],
+                       Set[str]):
+        """
+        :return: The line edits that move and trim the imports, refer to
+            `CodeDumper._get_code_from_lines`, the moved modules mapped to
+            the functions that now import them, and the modules that are
+            still imported at the root.
+        """
+        self._find_candidates()
+        self._find_decorators()
+        for stmt in self._iter_dumped_statements():
+            self._add_uses(stmt)
+
+        edits = defaultdict(list, self.trimmer.get_edits())
+        moved = defaultdict(list)
+        eager = set()
+        for stmt in self.dumper.root.body:
+            if not isinstance(stmt, (ast.Import, ast.ImportFrom)) or \
+                    stmt.lineno not in self.line_numbers:
+                continue
+            modules = self._get_modules(stmt)
+            functions = self.functions.get(stmt)
+            if stmt in self.eager or not functions or \
+                    not all(self._can_insert(f, stmt) for f in functions):
+                eager.update(modules)
+                continue
+
+            for lineno in range(stmt.lineno, stmt.end_lineno + 1):
+                edits[lineno] = []
+            for function in sorted(functions, key=lambda f: f.lineno):
+                self._insert(edits, function, stmt)
+            log("Moving `%s` into %s", ', '.join(modules),
+                ', '.join(f.qualname for f in functions))
+            for module in modules:
+                moved[module].extend(sorted(f.qualname for f in functions))
+
+        # Don't leave the blank lines after the imports at the top of the dump
+        # when they're all moved.
+        for lineno in sorted(self.line_numbers):
+            if lineno not in edits and \
+                    not self.dumper.source[lineno - 1].strip():
+                edits[lineno] = []
+            elif edits.get(lineno) != []:
+                break
+        return edits, dict(moved), eager
+
+    def _find_candidates(self):
+        root = self.dumper.root
+        bound = defaultdict(set)
+        for name, ref in self.dumper.scope_map.get(root).items():
+            for mv in ref:
+                bound[name].add(mv.definition)
+
+        for index, stmt in enumerate(root.body):
+            if not isinstance(stmt, (ast.Import, ast.ImportFrom)) or \
+                    stmt.lineno not in self.line_numbers:
+                continue
+            if isinstance(stmt, ast.ImportFrom) and \
+                    stmt.module == '__future__':
+                continue
+            siblings = root.body[index - 1:index] + root.body[index + 1:
+                                                              index + 2]
+            if any(s.end_lineno >= stmt.lineno and s.lineno <= stmt.end_lineno
+                   for s in siblings):
+                # Shares a line with another statement, e.g. `import a; b()`.
+                continue
+
+            names = [name for name, definitions in bound.items()
+                     if stmt in definitions]
+            if not names or any(bound[name] != {stmt} for name in names):
+                # Nothing to move, `*` imports, or names bound elsewhere too.
+                continue
+            for name in names:
+                self.names[name] = stmt
+                for mv in self.dumper.scope_map.get(root).get(name):
+                    self.imports[mv] = stmt
+
+    def _find_decorators(self):
+        for stmt in self._iter_dumped_statements():
+            if self.dumper.parser.runs_on_import(stmt):
+                self.decorators.update(
+                    self.dumper._get_decorating_functions(stmt))
+
+    def _iter_dumped_statements(self):
+        for stmt in self.dumper.root.body:
+            if stmt.lineno not in self.line_numbers:
+                continue
+            for node in ast.walk(stmt):
+                # Skips the members of tree-shaken classes that were dropped.
+                if isinstance(node, ast.stmt) and \
+                        node.lineno in self.line_numbers:
+                    yield node
+
+    def _add_uses(self, stmt: ast.stmt):
+        imports = set()
+        for dep in stmt.dependencies:
+            if isinstance(dep, VariableReference):
+                imports.update(self.imports[mv] for mv in dep
+                               if mv in self.imports)
+            else:
+                # Never parsed, so it could refer to anything with the name.
+                name = dep if isinstance(dep, str) else dep.id
+                if name in self.names:
+                    self.eager.add(self.names[name])
+        if not imports:
+            return
+
+        # Where the statement runs. Class bodies run where they're defined.
+        function = None
+        scope = stmt.var_scope
+        while scope is not self.dumper.root:
+            if isinstance(scope, _function_nodes):
+                function = scope
+            scope = scope.var_scope
+        for import_ in imports:
+            if function is None or function in self.decorators or \
+                    function in self.dumper.parser.import_time_bodies:
+                self.eager.add(import_)
+            else:
+                self.functions[import_].add(function)
+
+    def _can_insert(self, function: ast.stmt, stmt: ast.stmt) -> bool:
+        if function not in self.dumper.parser.parsed_bodies:
+            return False
+        start = self._get_insertion_point(function)
+        if start is None:
+            return False
+        for node in ast.walk(function):
+            if isinstance(node, (ast.Global, ast.Nonlocal)) and \
+                    any(self.names.get(name) is stmt for name in node.names):
+                return False
+        return True
+
+    def _get_insertion_point(self, function: ast.stmt) -> ast.stmt:
+        """
+        The statement to insert imports before, or None if there's no line to
+        insert them on. If the body is only a docstring, the docstring, which
+        they go after.
+        """
+        body = function.body
+        start = body[0]
+        if self.dumper._has_docstring(function) and len(body) > 1:
+            if body[1].lineno <= body[0].end_lineno:
+                return None
+            start = body[1]
+        if start.lineno <= function.lineno:
+            return None
+        return start
+
+    def _insert(self, edits: Dict[int, List[str]], function: ast.stmt,
+                stmt: ast.stmt):
+        source = self.dumper.source
+        start = self._get_insertion_point(function)
+        lineno = self.dumper._get_first_lineno(start)
+        first = source[lineno - 1]
+        indent = first[:len(first) - len(first.lstrip())]
+        text = self.trimmer.get_source(stmt)
+        lines = [indent + line for line in text.split('\n')]
+
+        if start is function.body[0] and self.dumper._has_docstring(function):
+            # The body is only a docstring, so the imports go after it.
+            lineno = start.end_lineno
+            if not edits[lineno]:
+                edits[lineno].append(source[lineno - 1])
+            edits[lineno].extend(lines)
+        else:
+            if not edits[lineno]:
+                edits[lineno].append(source[lineno - 1])
+            edits[lineno][-1:-1] = lines
+
+    def _get_modules(self, stmt: ast.stmt) -> List[str]:
+        """
+        The absolute modules an import loads, from its source since `compact`
+        drops the aliases.
+        """
+        node = ast.parse(self.trimmer.get_source(stmt)).body[0]
+        if isinstance(node, ast.Import):
+            return [alias.name for alias in node.names]
+        if node.level:
+            return []
+        return [node.module]
@@ -1,6 +1,15 @@
 import ast
 import itertools
-from typing import List
+from array import array
+from typing import Dict, List, Optional, Set, Tuple
+
+# Shared by every MemoryVariable until it actually records a usage, since most
+# never record loads or mutations.
+_NO_USAGES = ()
+
+# Usage arrays up to this long are scanned for duplicates. Longer ones get a
+# set of their ordinals, refer to `Memory.get_ordinal_set`.
+_SCAN_LIMIT = 8
 
 
 class MemoryVariable:
@@ -8,46 +17,88 @@ class MemoryVariable:
     A specific usage context for a specific variable within a specific scope.
     A MemoryVariable can only be defined once. All subsequent uses have to be
     mutations.
+
+    Usages are stored as arrays of statement ordinals (refer to
+    `Memory.get_ordinal`), each statement at most once per usage type. The
+    arrays are only allocated once they're needed. While they're recorded,
+    long arrays are deduplicated with a set kept by the Memory.
     """
 
-    def __init__(self, address):
+    __slots__ = ('address', 'memory', '_stores', '_loads', '_mutates')
+
+    def __init__(self, address, memory: 'Memory' = None):
         """
         Create a new MemoryVariable.
         :param address: The memory address that this variable exists at.
+        :param memory: The Memory that numbers the statements it uses.
         """
         self.address = address
-        self.stores = []
-        self.loads = []
-        self.mutates = []
+        self.memory = memory if memory is not None else Memory()
+        self._stores = _NO_USAGES
+        self._loads = _NO_USAGES
+        self._mutates = _NO_USAGES
+
+    @property
+    def stores(self) -> List[ast.stmt]:
+        return self.memory.get_statements(self._stores)
+
+    @property
+    def loads(self) -> List[ast.stmt]:
+        return self.memory.get_statements(self._loads)
+
+    @property
+    def mutates(self) -> List[ast.stmt]:
+        return self.memory.get_statements(self._mutates)
 
     @property
     def definition(self) -> ast.stmt:
         """
         The statement that defines this MemoryVariable.
         """
-        return self.stores[0] if self.stores else None
+        if not self._stores:
+            return None
+        return self.memory.get_statement(self._stores[0])
 
     def add(self, type_name, source_node: ast.AST):
+        if self.memory.frozen:
+            raise RuntimeError("Tried to add a usage in frozen memory.")
         if not isinstance(source_node, ast.stmt):
             source_node = source_node.find_ancestor(nf_type=ast.stmt)
 
-        getattr(self, type_name).append(source_node)
+        attr = '_' + type_name
+        ordinals = getattr(self, attr)
+        ordinal = self.memory.get_ordinal(source_node)
+        journal = self.memory.journal
+        if journal is not None:
+            journal.add(self)
+        if ordinals is _NO_USAGES:
+            setattr(self, attr, array('I', (ordinal,)))
+        elif len(ordinals) < _SCAN_LIMIT:
+            if ordinal not in ordinals:
+                ordinals.append(ordinal)
+        else:
+            seen = self.memory.get_ordinal_set(self, attr)
+            if ordinal not in seen:
+                seen.add(ordinal)
+                ordinals.append(ordinal)
 
     def __iter__(self):
         """
         Iterate over all of stores, loads, dels within a single iterator.
         :return: Iterator combining the values of stores, loads, and dels.
         """
-        return itertools.chain(self.stores, self.loads, self.mutates)
+        return map(self.memory.get_statement,
+                   itertools.chain(self._stores, self._loads, self._mutates))
 
     def __str__(self):
         return "{}".format(self.address)
 
     def clone(self):
-        mv = MemoryVariable(self.address)
-        mv.stores = self.stores.copy()
-        mv.loads = self.loads.copy()
-        mv.mutates = self.mutates.copy()
+        mv = MemoryVariable(self.address, self.memory)
+        for attr in ('_stores', '_loads', '_mutates'):
+            ordinals = getattr(self, attr)
+            if ordinals is not _NO_USAGES:
+                setattr(mv, attr, array('I', ordinals))
         return mv
 
 
@@ -56,21 +107,96 @@ class Memory:
     Simulates the way programming languages work in terms of values vs
     references. Any variable will refer to an address which in turn refers to a
     MemoryVariable.
+
+    It also numbers every statement that a MemoryVariable uses, so that
+    usages can be stored compactly as integers.
     """
 
     def __init__(self, mem=None):
         super().__init__()
         self._mem: List[MemoryVariable] = mem or []
+        self._statements: List[ast.stmt] = []
+        self._ordinals: Dict[ast.stmt, int] = {}
+        self.frozen = False
+
+        # Variables that were used while a journal was open. Only the innermost
+        # journal records usages.
+        self._journals: List[Set[MemoryVariable]] = []
+
+        # The ordinals of long usage arrays, by variable and usage type. Only
+        # needed until the memory is frozen.
+        self._ordinal_sets: Dict[Tuple[MemoryVariable, str], Set[int]] = {}
 
     def new_address(self) -> MemoryVariable:
+        if self.frozen:
+            raise RuntimeError("Tried to allocate a variable in frozen memory.")
         address = len(self._mem)
-        mv = MemoryVariable(address=address)
+        mv = MemoryVariable(address=address, memory=self)
         self._mem.append(mv)
         return mv
 
+    def start_journal(self):
+        """
+        Start recording the variables that get used. Journals can be nested,
+        in which case usages only go to the innermost one.
+        """
+        self._journals.append(set())
+
+    def stop_journal(self) -> Set[MemoryVariable]:
+        """
+        Stop the innermost journal.
+        :return: The variables that were used while it was open.
+        """
+        return self._journals.pop()
+
+    @property
+    def journal(self) -> Optional[Set[MemoryVariable]]:
+        """
+        The innermost open journal, or None if there isn't one.
+        """
+        return self._journals[-1] if self._journals else None
+
+    def get_ordinal_set(self, mv: MemoryVariable, attr: str) -> Set[int]:
+        """
+        Get the set of ordinals in one of the usage arrays of `mv`, so that
+        checking a long array for a statement doesn't scan it. The set is
+        built on first use and has to be kept in sync with the array.
+        :param mv: The variable.
+        :param attr: The usage array, e.g. '_loads'.
+        """
+        key = (mv, attr)
+        if key not in self._ordinal_sets:
+            self._ordinal_sets[key] = set(getattr(mv, attr))
+        return self._ordinal_sets[key]
+
+    def freeze(self):
+        """
+        Forbid allocating variables or recording usages from now on, and drop
+        what was only needed for recording them.
+        """
+        self.frozen = True
+        self._ordinal_sets.clear()
+
     def get(self, addr) -> MemoryVariable:
         return self._mem[addr]
 
+    def get_ordinal(self, stmt: ast.stmt) -> int:
+        """
+        Get the number of a statement, numbering it if it's new.
+        """
+        try:
+            return self._ordinals[stmt]
+        except KeyError:
+            self._ordinals[stmt] = len(self._statements)
+            self._statements.append(stmt)
+            return self._ordinals[stmt]
+
+    def get_statement(self, ordinal: int) -> ast.stmt:
+        return self._statements[ordinal]
+
+    def get_statements(self, ordinals) -> List[ast.stmt]:
+        return [self._statements[ordinal] for ordinal in ordinals]
+
     def __repr__(self):
         return repr(self._mem)
 
@@ -79,7 +205,3 @@ class Memory:
 
     def __len__(self):
         return len(self._mem)
-
-    def clone(self):
-        mem = [mv.clone() for mv in self._mem]
-        return Memory(mem)
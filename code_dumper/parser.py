@@ -1,34 +1,98 @@
 import ast
-from typing import Union
+from operator import attrgetter
+from typing import Iterator, List, Union
 
 from code_dumper.finder import NodeFinder
 from code_dumper.helpers import get_name_nodes, log
+from code_dumper.hooks import HookList
+from code_dumper.memory import MemoryVariable
+from code_dumper.types import variable_scope_nodes
 from code_dumper.variables import VariableScope, VariableScopeMap
 
 
+class FunctionSummary:
+    """
+    What running a function body does to variables outside of it, i.e. the
+    globals and nonlocals that it stores and mutates. A body is only parsed
+    once, after which its summary is applied to every call site.
+    """
+
+    def __init__(self, stores: List[MemoryVariable],
+                 mutates: List[MemoryVariable]):
+        """
+        :param stores: Outer variables that are defined by the body.
+        :param mutates: Outer variables that existed before, and that the body
+            uses.
+        """
+        self.stores = stores
+        self.mutates = mutates
+
+    def apply(self, call: ast.Call):
+        """
+        Attribute the function's effects to a call of it.
+        :param call: The call.
+        """
+        for mv in self.stores:
+            mv.add('stores', call)
+        for mv in self.mutates:
+            mv.add('mutates', call)
+
+
 class Parser:
     """
     Parse an AST to build an understanding of variables, their usages,
     redeclarations, etc.
     """
 
-    def __init__(self, root: ast.Module, scope_map: VariableScopeMap):
+    def __init__(self, root: ast.Module, scope_map: VariableScopeMap,
+                 finder: NodeFinder = None, hooks: HookList = None):
         """
         Instantiate a new Parser.
         :param root: The root node to start parsing from.
         :param scope_map: The scope map to update with values.
+        :param finder: An existing NodeFinder for `root`, to share its index.
+        :param hooks: Hooks to notify of every parsed statement.
         """
         self.root = root
         self.scope_map = scope_map
-        self.finder = NodeFinder(root)
+        self.finder = finder or NodeFinder(root)
+        self.hooks = hooks or HookList()
+
+        # How many function bodies are being parsed.
+        self.depth = 0
+
+        # Statements and function/class bodies that have been parsed.
+        self.parsed = set()
+        self.parsed_bodies = set()
 
-        self.parsed = []
+        # Effects of every function body that has been parsed, the local
+        # variables of all of them, and those allocated while running methods.
+        self.summaries = {}
+        self.local_variables = set()
+        self.method_locals = set()
 
         # Parse the statements
         scp = self.scope_map.get(self.root)
         for stmt in self.root.body:
             self._parse_stmt(stmt, scp, conditional=False)
 
+        # The function bodies that run when the module is imported, i.e. the
+        # ones that the root calls, directly or not. Refer to
+        # `Parser.runs_on_import`.
+        self.import_time_bodies = frozenset(self.parsed_bodies)
+
+    def runs_on_import(self, stmt: ast.stmt) -> bool:
+        """
+        Whether a statement runs when the module is imported. Every body is
+        parsed, but what a function's body does to variables only matters to
+        a dump if the function is called. Either it runs on import, or the
+        dump calls it and so includes the whole function anyway.
+        """
+        scope = stmt.var_scope
+        while isinstance(scope, ast.ClassDef):
+            scope = scope.var_scope
+        return scope is self.root or scope in self.import_time_bodies
+
     def _parse_stmt(self, stmt: ast.stmt, scp: VariableScope, conditional):
         """
         Given a statement, call its corresponding handler, then handle its
@@ -41,7 +105,9 @@ class Parser:
         if stmt in self.parsed:
             return log("Parser: Already parsed L%d: %s", stmt.lineno, stmt)
         log("Parser: Parsing L%d: %s", stmt.lineno, stmt)
-        self.parsed.append(stmt)
+        self.parsed.add(stmt)
+        if self.hooks:
+            self.hooks.statement_parsed(stmt, stmt.lineno, self.depth)
 
         # Call the appropriate handler.
         if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
@@ -74,31 +140,94 @@ class Parser:
         if isinstance(stmt, (ast.With, ast.AsyncWith)):
             self._parse_with(stmt, scp, conditional)
 
+        if isinstance(stmt, ast.Try):
+            self._parse_try(stmt, scp, conditional)
+
         self._parse_dependencies(stmt, scp, conditional)
 
     def _parse_dependencies(self, stmt, scp, conditional):
         # Convert all name dependencies into VariableReferences
         deps = set()
+        identifiers = {}
         for name in stmt.dependencies:
             identifier = scp.get(name.id)
+            identifiers[name.id] = identifier
             deps.add(identifier)
             call = name.find_ancestor(nf_type=ast.Call)
             if call and call.root_name == name:
                 # This dependency is being called. We should figure out what it
                 # does to our variable scopes (if we have access to its source).
-                # NOTE: This does not look at methods and stuff, please fix.
-                # If a class constructor is being called, check cls.__init__
-                for mv in identifier:
-                    definition = mv.definition
-                    if definition is None:
-                        # We don't have the source code.
-                        continue
-                    if isinstance(definition, ast.FunctionDef):
-                        # It's a function.
-                        self._parse_function_body(definition, conditional,
-                                                  call=call)
+                callees = list(self._get_callees(name, identifier, call))
+                for callee in callees:
+                    self._parse_function_body(callee, conditional, call=call)
 
         stmt.dependencies = deps
+        if hasattr(stmt, 'header_dependencies'):
+            # Only used to dump blocks without their bodies.
+            stmt.header_dependencies = {identifiers[name.id]
+                                        for name in stmt.header_dependencies}
+
+    def _get_callees(self, name: ast.Name, identifier,
+                     call: ast.Call) -> Iterator[ast.FunctionDef]:
+        """
+        Get the function definitions that `call` runs, for each definition
+        that `name` might refer to. Handles plain functions, class
+        constructors, and methods called on a class or on `self`/`cls`.
+        """
+        attr = None
+        if call.func is not name:
+            if not (isinstance(call.func, ast.Attribute) and
+                    call.func.value is name):
+                # Too far down an attribute chain to follow.
+                return
+            attr = call.func.attr
+
+        for mv in identifier:
+            definition = mv.definition
+            if isinstance(definition, ast.ClassDef):
+                # [A()] runs A.__init__, [A.method()] runs A.method.
+                method = self._get_method(definition, attr or '__init__')
+                if method:
+                    yield method
+                continue
+
+            if not isinstance(definition, ast.FunctionDef):
+                # We don't have the source code, or it isn't a function.
+                continue
+
+            args = self._get_args(definition)
+            if attr is None:
+                if name.id not in {arg.arg for arg in args}:
+                    # It's the function itself. [f()]
+                    yield definition
+            elif (definition.ismethod and args and args[0].arg == name.id):
+                # It's a method called on `self` or `cls`. [self.method()]
+                method = self._get_method(definition.parent, attr)
+                if method:
+                    yield method
+
+    @staticmethod
+    def _get_method(cls: ast.ClassDef, name: str) -> ast.FunctionDef:
+        """
+        Get the method that a class body defines last for `name`, or None.
+        """
+        for stmt in reversed(cls.body):
+            if isinstance(stmt, ast.FunctionDef) and stmt.name == name:
+                return stmt
+        return None
+
+    @staticmethod
+    def _get_args(target: ast.FunctionDef) -> List[ast.arg]:
+        """
+        Get all arguments of a function, positional ones first.
+        """
+        return [
+            *(target.args.posonlyargs if hasattr(target.args, 'posonlyargs') else []),
+            *(target.args.args if hasattr(target.args, 'args') else []),
+            *(target.args.kwonlyargs if hasattr(target.args, 'kwonlyargs') else []),
+            *([target.args.vararg] if target.args.vararg else []),
+            *([target.args.kwarg] if target.args.kwarg else []),
+        ]
 
     def _parse_function_def(self, stmt: Union[ast.FunctionDef,
                                               ast.AsyncFunctionDef],
@@ -133,7 +262,12 @@ class Parser:
         # KNOWN ISSUES:
         # - List/tuple unpacking does not properly assign the memory
         #   addresses to their corresponding variables.
-        for target in stmt.targets:
+        if isinstance(stmt, ast.AnnAssign):
+            # A bare annotation [a: int] doesn't assign anything.
+            targets = [stmt.target] if stmt.value else []
+        else:
+            targets = stmt.targets
+        for target in targets:
             if isinstance(target, ast.Name):
                 # Assignment to a single variable.
                 if isinstance(stmt.value, ast.Name):
@@ -153,7 +287,8 @@ class Parser:
                     # Get the variable and add a mutation.
                     scp.get(var.root_name.id).add('mutates', stmt)
 
-            for var in get_name_nodes(target, stores=True):
+            for var in get_name_nodes(target, stores=True,
+                                      finder=self.finder):
                 # It's a direct assignment [a = 4], [a, b = 1, 2]
                 scp.new(var.id, conditional).add('stores', stmt)
 
@@ -181,7 +316,8 @@ class Parser:
     def _parse_for(self, stmt: Union[ast.For, ast.AsyncFor],
                    scp: VariableScope, conditional: bool):
         # Get all variables that the loop writes to.
-        for var in get_name_nodes(stmt.target, stores=True):
+        for var in get_name_nodes(stmt.target, stores=True,
+                                  finder=self.finder):
             scp.new(var.id, conditional).add('stores', stmt)
 
         # Parse its body. Conditional because the loop might never run.
@@ -204,71 +340,142 @@ class Parser:
                     scp: VariableScope, conditional: bool):
         # Assign the variables that `with` defines.
         for item in stmt.items:
-            for name in get_name_nodes(item, stores=True):
+            for name in get_name_nodes(item, stores=True,
+                                       finder=self.finder):
                 scp.new(name.id, conditional).add('stores', stmt)
 
         # Parse its body.
         for stmt_ in stmt.body:
             self._parse_stmt(stmt_, scp, conditional)
 
+    def _parse_try(self, stmt: ast.Try, scp: VariableScope,
+                   conditional: bool):
+        # Assign the names of the exception handlers.
+        for handler in stmt.handlers:
+            if handler.name:
+                scp.new(handler.name, True).add('stores', stmt)
+
+        # Parse its bodies. Conditional because an exception might be raised
+        # anywhere, except for `finally`, which always runs.
+        for stmt_ in stmt.body + stmt.orelse:
+            self._parse_stmt(stmt_, scp, conditional=True)
+        for handler in stmt.handlers:
+            for stmt_ in handler.body:
+                self._parse_stmt(stmt_, scp, conditional=True)
+        for stmt_ in stmt.finalbody:
+            self._parse_stmt(stmt_, scp, conditional)
+
     def _parse_function_body(self, target: ast.FunctionDef, conditional: bool,
                              call: ast.Call = None):
-        if target.body in self.parsed:
+        if target in self.parsed_bodies:
+            if call and target in self.summaries:
+                self._apply_summary(target, call)
             return log("Parser: Already parsed body L%d: %s",
                        target.lineno, target)
         log("Parser: Parsing body L%d: %s", target.lineno, target)
-        self.parsed.append(target)
+        self.parsed_bodies.add(target)
 
         # Get the new scope.
         scp = self.scope_map.get(target)
 
         # Define all the arguments as variables.
+        memory = self.scope_map.memory
+        first_address = len(memory)
         names = set()
-
-        consolidated = [
-            *(target.args.args if hasattr(target.args, 'args') else []),
-            *(target.args.posonlyargs if hasattr(target.args, 'posonlyargs') else []),
-            *(target.args.kwonlyargs if hasattr(target.args, 'kwonlyargs') else []),
-            *([target.args.vararg] if target.args.vararg else []),
-            *([target.args.kwarg] if target.args.kwarg else []),
-        ]
-        for arg in consolidated:
+        for arg in self._get_args(target):
             if arg.arg in names:
                 continue
             scp.new(arg.arg, conditional).add("stores", target)
             names.add(arg.arg)
 
-        # Store before state
-        before = self.scope_map.memory.clone()
-
-        # Parse its body.
-        for stmt in target.body:
-            self._parse_stmt(stmt, scp, conditional)
-
-        if not call:
-            return
-
-        # Find the changes caused by "executing" the function body and link
-        # them back to the initial ast.Call so we know to include it later.
-        for i, new_mv in enumerate(self.scope_map.memory):
-            if i >= len(before):
-                # It's a new thing defined by this function.
-                new_mv.add('stores', call)
-                continue
-            old_mv = before.get(i)
-            if set(old_mv) != set(new_mv):
-                # There's been a mutation
-                new_mv.add('mutates', call)
+        # Record what "executing" the function body uses.
+        body_address = len(memory)
+        memory.start_journal()
+        self.depth += 1
+        try:
+            for stmt in target.body:
+                self._parse_stmt(stmt, scp, conditional)
+        finally:
+            self.depth -= 1
+            used = memory.stop_journal()
+
+        self.summaries[target] = self._summarize(scp, first_address,
+                                                 body_address, used)
+        if target.ismethod:
+            self.method_locals.update(
+                mv for mv in map(memory.get, range(first_address, len(memory)))
+                if mv in self.local_variables)
+        if call:
+            # Link the changes back to the initial ast.Call so we know to
+            # include it later.
+            self._apply_summary(target, call)
+            if not self.depth and not target.ismethod:
+                self._define_locals(body_address, call)
+
+    def _apply_summary(self, target: ast.FunctionDef, call: ast.Call):
+        self.summaries[target].apply(call)
+
+    def _define_locals(self, body_address: int, call: ast.Call):
+        """
+        Define the locals that a function body allocates, its own and those of
+        the functions it calls, at the module level call that first runs it.
+        Dumps that load them keep that one call, and neither every other one
+        nor the functions that call it. Methods run on objects, so the locals
+        allocated while running them are left out.
+        :param body_address: The first address allocated by the body.
+        :param call: The call.
+        """
+        memory = self.scope_map.memory
+        for address in range(body_address, len(memory)):
+            mv = memory.get(address)
+            if mv in self.local_variables and mv not in self.method_locals:
+                mv.add('stores', call)
+
+    def _summarize(self, scp: VariableScope, first_address: int,
+                   body_address: int, used) -> FunctionSummary:
+        """
+        Build the summary of a function body.
+        :param scp: The function's scope.
+        :param first_address: The first address allocated for the function,
+            i.e. for its arguments.
+        :param body_address: The first address allocated by the body.
+        :param used: The variables that the body used.
+        :return: The summary.
+        """
+        # Builtins and undefined names are allocated where they're first
+        # used, but nothing stores them, so a call doesn't define them.
+        memory = self.scope_map.memory
+        allocated = [memory.get(address)
+                     for address in range(first_address, len(memory))]
+        unbound = {mv for mv in allocated if mv.definition is None}
+
+        # Variables allocated for the function that are only bound in its own
+        # scope are its locals, and don't outlive a call.
+        local = set()
+        shared = set()
+        for ref in scp.values():
+            (local if ref.scope is scp else shared).update(ref)
+        local = {mv for mv in local - shared - unbound
+                 if mv.address >= first_address}
+        self.local_variables.update(local)
+
+        # Leave out the locals, including those of the functions that the
+        # body called.
+        stores = [mv for mv in allocated[body_address - first_address:]
+                  if mv not in self.local_variables and mv not in unbound]
+        mutates = [mv for mv in sorted(used, key=attrgetter('address'))
+                   if mv.address < body_address and mv not in local]
+        return FunctionSummary(stores, mutates)
 
     def _parse_class_body(self, target: ast.ClassDef, conditional: bool):
         """
         "Execute" all methods of the class.
         """
-        if target.body in self.parsed:
+        if target in self.parsed_bodies:
             return log("Parser: Already parsed body L%d: %s",
                        target.lineno, target)
         log("Parser: Parsing body L%d: %s", target.lineno, target)
-        self.parsed.append(target)
+        self.parsed_bodies.add(target)
 
         for stmt in target.body:
             # Only include methods.
@@ -287,3 +494,20 @@ class Parser:
             return self._parse_class_body(target, False)
 
         raise TypeError('Tried to parse unknown target type %s' % type(target))
+
+    def parse_targets(self):
+        """
+        Parse the body of every function and class that can be dumped from the
+        root scope. Parsing a body can define new targets in the root scope
+        (through `global`), so this repeats until none are left.
+        """
+        root_scp = self.scope_map.get(self.root)
+        while True:
+            targets = [mv.definition for ref in list(root_scp.values())
+                       for mv in sorted(ref, key=attrgetter('address'))
+                       if isinstance(mv.definition, variable_scope_nodes)
+                       and mv.definition not in self.parsed_bodies]
+            if not targets:
+                return
+            for target in targets:
+                self.parse_target(target)
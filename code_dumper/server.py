@@ -0,0 +1,384 @@
+import errno
+import hashlib
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import struct
+import tempfile
+import threading
+import time
+import tokenize
+from collections import OrderedDict
+
+from code_dumper.dumper import CodeDumper
+from code_dumper.helpers import log
+
+# Every message is a 4-byte big-endian length followed by that many bytes of
+# UTF-8 encoded JSON.
+HEADER = struct.Struct('>I')
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+
+def default_socket_path() -> str:
+    """
+    The socket path used when none is given, inside a directory that's
+    unique per user and that only they can access, refer to
+    `make_private_directory`.
+    """
+    uid = os.getuid() if hasattr(os, 'getuid') else 0
+    return os.path.join(tempfile.gettempdir(),
+                        'code-dumper-{}'.format(uid), 'server.sock')
+
+
+def make_private_directory(path: str):
+    """
+    Create a directory that only the current user can access, or check that
+    an existing one is.
+    :raises PermissionError: If the directory belongs to someone else, or
+        others can access it.
+    """
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode):
+        raise NotADirectoryError(errno.ENOTDIR, "Not a directory.", path)
+    if hasattr(os, 'getuid') and st.st_uid != os.getuid():
+        raise PermissionError(errno.EPERM,
+                              "The directory belongs to another user.", path)
+    if st.st_mode & 0o077:
+        raise PermissionError(errno.EPERM,
+                              "Other users can access the directory.", path)
+
+
+def remove_stale_socket(path: str):
+    """
+    Remove a socket that was left behind by a server that's no longer
+    running.
+    :raises OSError: If a server is still listening on it, or if the path
+        isn't a socket.
+    """
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(st.st_mode):
+        raise OSError(errno.EEXIST, "Not a socket, refusing to remove it.",
+                      path)
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        log("Server: Removing stale socket %s", path)
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    else:
+        raise OSError(errno.EADDRINUSE,
+                      "Another server is listening on the socket.", path)
+    finally:
+        probe.close()
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError("Connection closed mid-message.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def send_message(sock: socket.socket, message: dict):
+    """
+    Send a length-prefixed JSON message.
+    """
+    data = json.dumps(message).encode('utf-8')
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock: socket.socket):
+    """
+    Receive a length-prefixed JSON message.
+    :return: The decoded message, or None if the peer closed the connection.
+    """
+    header = sock.recv(HEADER.size, socket.MSG_WAITALL)
+    if not header:
+        return None
+    if len(header) < HEADER.size:
+        header += _recv_exactly(sock, HEADER.size - len(header))
+    size, = HEADER.unpack(header)
+    if size > MAX_MESSAGE_SIZE:
+        raise ValueError("Message of {} bytes is too large.".format(size))
+    return json.loads(_recv_exactly(sock, size).decode('utf-8'))
+
+
+class _CacheEntry:
+    """
+    A warm analysis, along with what's needed to tell if it's stale.
+    """
+
+    def __init__(self, mtime_ns, size, digest, dumper: CodeDumper):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = digest
+        self.dumper = dumper
+
+
+class AnalysisCache:
+    """
+    A bounded, least-recently-used cache of CodeDumpers keyed by file path.
+    Entries are revalidated against the file's mtime and size on every use.
+    If those changed, the content hash decides whether to re-analyse.
+    Analyses are compacted before they're cached, refer to
+    `CodeDumper.compact`.
+    """
+
+    def __init__(self, max_size=32, compact=True):
+        self.max_size = max_size
+        self.compact = compact
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._path_locks = {}
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0,
+                      'invalidations': 0, 'evictions': 0}
+
+    def get(self, path: str) -> CodeDumper:
+        """
+        Get the analysis for the file at `path`, building it if needed.
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            path_lock = self._path_locks.setdefault(path, threading.Lock())
+
+        # Only one thread builds a given file, others wait for its result.
+        with path_lock:
+            st = os.stat(path)
+            with self._lock:
+                entry = self._entries.get(path)
+                if entry and (entry.mtime_ns, entry.size) == (st.st_mtime_ns,
+                                                              st.st_size):
+                    self._entries.move_to_end(path)
+                    self.stats['hits'] += 1
+                    return entry.dumper
+
+            with tokenize.open(path) as f:
+                source = f.read()
+            digest = hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+            if entry and entry.digest == digest:
+                # Touched, but not changed.
+                dumper = entry.dumper
+                stat = 'revalidated'
+            else:
+                log("Server: Analysing %s", path)
+                dumper = CodeDumper(source)
+                if self.compact:
+                    dumper.compact()
+                stat = 'invalidations' if entry else 'misses'
+
+            with self._lock:
+                self.stats[stat] += 1
+                self._entries[path] = _CacheEntry(st.st_mtime_ns, st.st_size,
+                                                  digest, dumper)
+                self._entries.move_to_end(path)
+                while len(self._entries) > self.max_size:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._path_locks.pop(evicted, None)
+                    self.stats['evictions'] += 1
+            return dumper
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                request = recv_message(self.request)
+            except (ConnectionError, ValueError) as e:
+                log("Server: Dropping connection: %s", e)
+                return
+            if request is None:
+                return
+            send_message(self.request, self.server.handle_request(request))
+
+
+class DumpServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    A daemon that keeps analyses warm and answers dump requests over a Unix
+    domain socket.
+
+    Requests are JSON objects with an `op` and its arguments:
+      - {"op": "dump", "path": ..., "name": ...}
+      - {"op": "dump_many", "path": ..., "names": [...]}
+      - {"op": "fingerprint", "path": ..., "name": ...}
+      - {"op": "names", "path": ...}
+      - {"op": "dependents", "path": ..., "target": <qualname or line>}
+      - {"op": "stats"}
+    Responses are {"ok": true, "result": ...} or {"ok": false, "error": ...}.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str = None, cache_size=32):
+        """
+        :param socket_path: Where to listen. Defaults to
+            `default_socket_path()`, whose directory is created if needed.
+            A socket left behind by a server that's no longer running is
+            replaced.
+        :param cache_size: How many analyses to keep, refer to
+            `AnalysisCache`.
+        """
+        if socket_path is None:
+            socket_path = default_socket_path()
+            make_private_directory(os.path.dirname(socket_path))
+        self.socket_path = socket_path
+        remove_stale_socket(self.socket_path)
+        super().__init__(self.socket_path, _RequestHandler)
+
+        self.cache = AnalysisCache(cache_size)
+        self.started = time.time()
+        self._latency_lock = threading.Lock()
+        self.latency = {}
+
+    def server_bind(self):
+        super().server_bind()
+        # Only the owner may connect, wherever the socket is.
+        os.chmod(self.socket_path, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def handle_request(self, request: dict) -> dict:
+        start = time.perf_counter()
+        op = request.get('op') if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("Requests must be JSON objects, not {}."
+                                 .format(type(request).__name__))
+            handler = getattr(self, 'op_' + str(op), None)
+            if handler is None:
+                raise ValueError("Unknown op `{}`.".format(op))
+            response = {'ok': True, 'result': handler(request)}
+        except Exception as e:
+            response = {'ok': False,
+                        'error': '{}: {}'.format(type(e).__name__, e)}
+        self._record_latency(op, time.perf_counter() - start)
+        return response
+
+    def _record_latency(self, op, elapsed: float):
+        with self._latency_lock:
+            stats = self.latency.setdefault(
+                str(op), {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['count'] += 1
+            stats['total_ms'] += elapsed * 1000
+            stats['max_ms'] = max(stats['max_ms'], elapsed * 1000)
+
+    def op_dump(self, request):
+        return self.cache.get(request['path']).dump(request['name'])
+
+    def op_dump_many(self, request):
+        cd = self.cache.get(request['path'])
+        return [cd.dump(name) for name in request['names']]
+
+    def op_fingerprint(self, request):
+        return self.cache.get(request['path']).fingerprint(request['name'])
+
+    def op_names(self, request):
+        return self.cache.get(request['path']).get_dumpable_names()
+
+    def op_dependents(self, request):
+        cd = self.cache.get(request['path'])
+        return sorted(cd.get_dependents(request['target']))
+
+    def op_stats(self, request):
+        with self._latency_lock:
+            latency = {
+                op: dict(stats, mean_ms=stats['total_ms'] / stats['count'])
+                for op, stats in self.latency.items()}
+        return {'uptime_s': time.time() - self.started,
+                'cache': dict(self.cache.stats, size=len(self.cache),
+                              max_size=self.cache.max_size),
+                'latency': latency}
+
+
+def serve(socket_path: str = None, cache_size=32):
+    """
+    Run the dump daemon until interrupted.
+    """
+    # Shut down cleanly (removing the socket) on SIGTERM as well as Ctrl+C.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    with DumpServer(socket_path, cache_size) as server:
+        log("Server: Listening on %s", server.socket_path)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+class DumpClient:
+    """
+    A thin client for `DumpServer`. The connection is opened lazily and kept
+    open for subsequent requests.
+    """
+
+    def __init__(self, socket_path: str = None):
+        self.socket_path = socket_path or default_socket_path()
+        self._sock = None
+
+    def _request(self, **request):
+        if self._sock is None:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(self.socket_path)
+        send_message(self._sock, request)
+        response = recv_message(self._sock)
+        if response is None:
+            raise ConnectionError("Server closed the connection.")
+        if not response['ok']:
+            raise RuntimeError(response['error'])
+        return response['result']
+
+    def dump(self, path: str, name: str) -> str:
+        return self._request(op='dump', path=os.path.abspath(path), name=name)
+
+    def dump_many(self, path: str, names) -> list:
+        return self._request(op='dump_many', path=os.path.abspath(path),
+                             names=list(names))
+
+    def fingerprint(self, path: str, name: str) -> str:
+        return self._request(op='fingerprint', path=os.path.abspath(path),
+                             name=name)
+
+    def names(self, path: str) -> list:
+        return self._request(op='names', path=os.path.abspath(path))
+
+    def dependents(self, path: str, target) -> list:
+        return self._request(op='dependents', path=os.path.abspath(path),
+                             target=target)
+
+    def stats(self) -> dict:
+        return self._request(op='stats')
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
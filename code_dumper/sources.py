@@ -0,0 +1,178 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+import tokenize
+from typing import Dict, List, Optional
+
+from code_dumper.helpers import log
+
+
+class Source(str):
+    """
+    The source code of a module. It's a plain string, which also carries its
+    split lines, so they are only computed once for every CodeDumper that
+    analyses it.
+    """
+
+    @property
+    def lines(self) -> List[str]:
+        try:
+            return self._lines
+        except AttributeError:
+            self._lines = self.split('\n')
+            return self._lines
+
+    def __reduce__(self):
+        # Don't send the lines along when pickled, they're cheap to rebuild.
+        return Source, (str(self),)
+
+
+def _to_source(text: str) -> Source:
+    # Same as `inspect.getsource`, which gets it through `linecache`.
+    if text and not text.endswith('\n'):
+        text += '\n'
+    return text if isinstance(text, Source) else Source(text)
+
+
+class SourceProvider(ABC):
+    """
+    Finds the source code of modules. Providers are asked in order until one
+    of them has the source, refer to `register_source_provider`.
+    """
+
+    @abstractmethod
+    def get_source(self, name: str, module) -> Optional[Source]:
+        """
+        Get the source code of a module.
+        :param name: The module's name.
+        :param module: The module object, or None if it isn't imported.
+        :return: The source, or None if this provider doesn't have it.
+        """
+
+
+class _StatCache:
+    """
+    Sources keyed by the file they came from, along with the file's mtime and
+    size at the time it was read.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str, key, read) -> Optional[Source]:
+        """
+        Get the cached source for `path`, or call `read` if the file changed.
+        :param path: The file that backs the source.
+        :param key: Identifies the source within the file.
+        :param read: Returns the source, or None.
+        """
+        st = os.stat(path)
+        stamp = st.st_mtime_ns, st.st_size
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == stamp:
+                return entry[1]
+
+        log("Reading source of %s from %s", key, path)
+        source = read()
+        with self._lock:
+            self._entries[key] = stamp, source
+        return source
+
+
+class FileSourceProvider(SourceProvider):
+    """
+    Reads the source file of a module, and caches it until the file changes.
+    """
+
+    def __init__(self):
+        self._cache = _StatCache()
+
+    def get_source(self, name, module):
+        path = getattr(module, '__file__', None)
+        if not path or not path.endswith('.py') or not os.path.isfile(path):
+            return None
+
+        def read():
+            # Respects the encoding declaration, like the import system.
+            with tokenize.open(path) as f:
+                return _to_source(f.read())
+
+        return self._cache.get(path, path, read)
+
+
+class LoaderSourceProvider(SourceProvider):
+    """
+    Asks the module's loader for the source. This covers zip imports and any
+    other loader that implements `get_source`. If the loader reads from an
+    archive, the source is cached until the archive changes.
+    """
+
+    def __init__(self):
+        self._cache = _StatCache()
+
+    def get_source(self, name, module):
+        loader = getattr(module, '__loader__', None)
+        if not hasattr(loader, 'get_source'):
+            return None
+
+        def read():
+            source = loader.get_source(name)
+            return None if source is None else _to_source(source)
+
+        archive = getattr(loader, 'archive', None)
+        if archive and os.path.isfile(archive):
+            return self._cache.get(archive, (archive, name), read)
+        return read()
+
+
+class MemorySourceProvider(SourceProvider):
+    """
+    Sources that were added by name, for modules that only exist in memory.
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, Source] = {}
+
+    def add(self, name: str, source: str):
+        """
+        Add the source of a module, replacing any previous one.
+        """
+        self._sources[name] = _to_source(source)
+
+    def remove(self, name: str):
+        self._sources.pop(name, None)
+
+    def get_source(self, name, module):
+        return self._sources.get(name)
+
+
+memory_sources = MemorySourceProvider()
+_providers: List[SourceProvider] = [memory_sources, FileSourceProvider(),
+                                    LoaderSourceProvider()]
+
+
+def register_source_provider(provider: SourceProvider):
+    """
+    Add a provider, which is asked before all the existing ones.
+    """
+    _providers.insert(0, provider)
+
+
+def unregister_source_provider(provider: SourceProvider):
+    _providers.remove(provider)
+
+
+def get_module_source(name: str, module=None) -> Optional[Source]:
+    """
+    Get the source code of a module from the first provider that has it.
+    :param name: The module's name.
+    :param module: The module object, if it's imported.
+    :return: The source, or None if no provider has it.
+    """
+    for provider in list(_providers):
+        source = provider.get_source(name, module)
+        if source is not None:
+            return source
+    return None
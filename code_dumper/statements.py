@@ -0,0 +1,247 @@
+import ast
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from code_dumper.types import variable_scope_nodes
+
+# The blocks whose statements can be dumped separately, along with their
+# headers.
+splittable_nodes = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.With,
+                    ast.AsyncWith, ast.Try)
+_loop_nodes = (ast.For, ast.AsyncFor, ast.While)
+
+
+def get_header_nodes(block: ast.stmt) -> Iterator[ast.AST]:
+    """
+    Get the parts of a block that aren't in its bodies, i.e. what its headers
+    evaluate, including the types of exception handlers.
+    """
+    for child in ast.iter_child_nodes(block):
+        if isinstance(child, ast.excepthandler):
+            if child.type:
+                yield child.type
+        elif not isinstance(child, ast.stmt):
+            yield child
+
+
+class BlockSplitter:
+    """
+    Selects statements inside blocks without the rest of the block, for
+    `CodeDumper(statement_level=True)`. A statement in an `if`, `for`,
+    `while`, `with` or `try` block at the root is dumped along with the
+    headers of the blocks around it, such as `if x:`, `else:` or
+    `except E:`, instead of the whole block. Functions, classes and anything
+    else are still dumped whole.
+
+    The original source text is kept. Blocks that would end up with an
+    empty body get a `pass`.
+    """
+
+    def __init__(self, dumper):
+        self.dumper = dumper
+
+    def split(self, stmt: ast.stmt, shaken: dict
+              ) -> Tuple[ast.stmt, List[Tuple[ast.stmt, ast.AST]]]:
+        """
+        Find what needs to be dumped for a statement.
+        :param stmt: The statement.
+        :param shaken: Refer to `CodeDumper._resolve_stmt_dependencies`.
+        :return: The statement to dump whole, and the blocks around it that
+            only need their headers, innermost first. Each block comes with
+            its child that leads to the statement. If the statement is a block
+            itself, e.g. a `for` loop that defines its target, it only needs
+            its headers as well, so there's no statement to dump whole.
+        """
+        unit = stmt
+        blocks = []
+        if self._is_block(stmt):
+            unit = None
+            blocks.append((stmt, None))
+        node = stmt
+        while True:
+            parent = node.parent
+            if isinstance(parent, ast.excepthandler):
+                child, parent = parent, parent.parent
+            else:
+                child = node
+            if parent is self.dumper.root or parent in shaken:
+                break
+            if self._is_block(parent):
+                blocks.append((parent, child))
+            else:
+                # It has to be dumped whole.
+                unit = parent
+                blocks = []
+            node = parent
+        return unit, blocks
+
+    def _is_block(self, node: ast.AST) -> bool:
+        """
+        Whether a node is a block that can be dumped without its bodies.
+        """
+        return isinstance(node, splittable_nodes) and \
+            not isinstance(node, variable_scope_nodes) and \
+            self._is_splittable(node)
+
+    def _is_splittable(self, block: ast.stmt) -> bool:
+        """
+        Whether every clause of a block starts its bodies on a new line, so
+        its headers can be dumped on their own.
+        """
+        if not hasattr(block, 'splittable'):
+            block.splittable = all(
+                self._starts_line(body[0]) for body in self._get_bodies(block))
+        return block.splittable
+
+    def _starts_line(self, stmt: ast.stmt) -> bool:
+        # Decorators are indented like the definition.
+        line = self.dumper.source[self.dumper._get_first_lineno(stmt) - 1]
+        return len(line) - len(line.lstrip()) == stmt.col_offset
+
+    @staticmethod
+    def _get_bodies(block: ast.stmt) -> Iterator[List[ast.stmt]]:
+        yield block.body
+        for handler in getattr(block, 'handlers', ()):
+            yield handler.body
+        if getattr(block, 'orelse', None):
+            yield block.orelse
+        if getattr(block, 'finalbody', None):
+            yield block.finalbody
+
+    def get_lines(self, unit: ast.stmt,
+                  blocks: List[Tuple[ast.stmt, ast.AST]]) -> Set[int]:
+        """
+        Get the lines of a statement and of the headers around it, refer to
+        `BlockSplitter.split`.
+        """
+        line_numbers = set()
+        if unit is not None:
+            line_numbers.update(range(self.dumper._get_first_lineno(unit),
+                                      unit.end_lineno + 1))
+        for block, child in blocks:
+            line_numbers.update(self._get_header_lines(block, child))
+        return line_numbers
+
+    def _get_header_lines(self, block: ast.stmt, child: ast.AST) -> Set[int]:
+        get_first_lineno = self.dumper._get_first_lineno
+        lines = set(range(block.lineno, get_first_lineno(block.body[0])))
+
+        # A try block needs its handlers, which stay the same so that the
+        # same exceptions are caught.
+        for handler in getattr(block, 'handlers', ()):
+            lines.update(range(handler.lineno,
+                               get_first_lineno(handler.body[0])))
+
+        if child in getattr(block, 'orelse', ()):
+            else_line = self._get_else_line(block)
+            if else_line:
+                lines.add(else_line)
+        elif child in getattr(block, 'finalbody', ()):
+            lines.add(self._get_keyword_line(block, block.finalbody,
+                                             'finally'))
+        return lines
+
+    def _get_else_line(self, block: ast.stmt) -> Optional[int]:
+        """
+        The line of the `else:` of a block, or None for an `elif`, whose
+        header is the line of the nested `if`.
+        """
+        first = block.orelse[0]
+        if isinstance(block, ast.If) and len(block.orelse) == 1 and \
+                isinstance(first, ast.If):
+            line = self.dumper.source[first.lineno - 1]
+            if line[first.col_offset:].startswith('elif'):
+                return None
+        return self._get_keyword_line(block, block.orelse, 'else')
+
+    def _get_keyword_line(self, block: ast.stmt, body: List[ast.stmt],
+                          keyword: str) -> int:
+        """
+        The line of the keyword that starts a clause, which isn't in the AST.
+        It's the last one before the clause's first statement.
+        """
+        lineno = self.dumper._get_first_lineno(body[0]) - 1
+        while lineno > block.lineno:
+            line = self.dumper.source[lineno - 1].lstrip()
+            if line.startswith(keyword) and \
+                    line[len(keyword):].lstrip().startswith(':'):
+                return lineno
+            lineno -= 1
+        raise ValueError("Couldn't find `{}:` of the block at L{}."
+                         .format(keyword, block.lineno))
+
+    def get_statements(self, unit: ast.stmt,
+                       blocks: List[Tuple[ast.stmt, ast.AST]]
+                       ) -> Iterator[ast.stmt]:
+        """
+        Get the other statements that have to be dumped along with a
+        statement: the ones on the same lines, and the `break` and `continue`
+        statements of the loops around it, which decide what it ends up with.
+        """
+        if unit is not None and blocks:
+            parent = unit.parent
+            siblings = next(body for body in self._get_bodies(
+                parent.parent if isinstance(parent, ast.excepthandler)
+                else parent) if unit in body)
+            first = self.dumper._get_first_lineno(unit)
+            for sibling in siblings:
+                if sibling is not unit and sibling.lineno <= unit.end_lineno \
+                        and sibling.end_lineno >= first:
+                    yield sibling
+
+        for block, _ in blocks:
+            if isinstance(block, _loop_nodes):
+                yield from self._get_jumps(block.body)
+
+    def _get_jumps(self, body: List[ast.stmt]) -> Iterator[ast.stmt]:
+        for stmt in body:
+            if isinstance(stmt, (ast.Break, ast.Continue)):
+                yield stmt
+            elif isinstance(stmt, splittable_nodes) and \
+                    not isinstance(stmt, _loop_nodes):
+                for nested in self._get_bodies(stmt):
+                    yield from self._get_jumps(nested)
+
+    def _get_clauses(self, block: ast.stmt
+                     ) -> Iterator[Tuple[Optional[int], List[ast.stmt]]]:
+        """
+        Get the clauses of a block, as the last line of each one's header and
+        its statements. The header line is None for an `elif`.
+        """
+        get_first_lineno = self.dumper._get_first_lineno
+        yield get_first_lineno(block.body[0]) - 1, block.body
+        for handler in getattr(block, 'handlers', ()):
+            yield get_first_lineno(handler.body[0]) - 1, handler.body
+        if getattr(block, 'orelse', None):
+            yield self._get_else_line(block), block.orelse
+        if getattr(block, 'finalbody', None):
+            yield (self._get_keyword_line(block, block.finalbody, 'finally'),
+                   block.finalbody)
+
+    def get_edits(self, line_numbers: Set[int]) -> Dict[int, List[str]]:
+        """
+        Get the line edits that add a `pass` to every clause whose statements
+        were all left out, refer to `CodeDumper._get_code_from_lines`.
+
+        Only blocks that `split` can return are looked at, i.e. the ones that
+        are nested in blocks all the way up to the root. A block that was
+        dumped whole has no empty clauses, so the ones that do were split.
+        """
+        source = self.dumper.source
+        get_first_lineno = self.dumper._get_first_lineno
+        edits = {}
+        pending = [stmt for stmt in self.dumper.root.body
+                   if stmt.lineno in line_numbers]
+        while pending:
+            block = pending.pop()
+            if block.lineno not in line_numbers or not self._is_block(block):
+                continue
+            for header, body in self._get_clauses(block):
+                pending.extend(body)
+                if header not in line_numbers or \
+                        any(get_first_lineno(s) in line_numbers
+                            for s in body):
+                    continue
+                line = source[get_first_lineno(body[0]) - 1]
+                indent = line[:len(line) - len(line.lstrip())]
+                edits[header] = [source[header - 1], indent + 'pass']
+        return edits
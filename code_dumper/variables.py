@@ -2,6 +2,7 @@ import ast
 from typing import Iterable, Set
 
 from code_dumper.helpers import DefaultDictWithKey
+from code_dumper.hooks import HookList
 from code_dumper.memory import Memory, MemoryVariable
 from code_dumper.types import T
 
@@ -11,6 +12,8 @@ class VariableReference:
     This data-structure stores references to MemoryVariables, similar to what
     an identifier does in Python.
     """
+    __slots__ = ('name', 'scope', 'variables')
+
     def __init__(self, name=None, scope=None, variables=None):
         """
         Construct a new VariableReference.
@@ -84,8 +87,18 @@ class VariableScope(dict):
         self.scope_node = scope_node
         self.is_class = isinstance(self.scope_node, ast.ClassDef)
 
+    def __setitem__(self, name: str, ref: VariableReference):
+        if name not in self:
+            # A new binding can change where `name` resolves to from any of
+            # the scopes nested in this one.
+            self.map.invalidate_resolution(name)
+        super().__setitem__(name, ref)
+
     def get(self, name: str, inherit_from_parent=True) -> VariableReference:
         if name not in self:
+            if self.map.frozen:
+                raise KeyError("`{}` does not exist in frozen scope {}."
+                               .format(name, self))
             mvs = None
             if inherit_from_parent:
                 # The identifier doesn't exist in this scope, so we need to
@@ -111,6 +124,8 @@ class VariableScope(dict):
         Create a memory variable for the identifier.
         """
         mv = self.map.memory.new_address()
+        if self.map.hooks:
+            self.map.hooks.variable_allocated(mv, name, self.scope_node)
         vr = self.get(name, inherit_from_parent=False)
         vr.set({mv}, conditional)
         return vr
@@ -152,15 +167,32 @@ class VariableScopeMap:
         `inherits` which refers back to the original context.
     """
 
-    def __init__(self, root):
+    def __init__(self, root, hooks: HookList = None):
         """
         Create a new VariableScopeMap.
+        :param root: The root node.
+        :param hooks: Hooks to notify of every allocated variable.
         """
         self.root = root
+        self.hooks = hooks or HookList()
         self.memory = Memory()
         self.scope_map = DefaultDictWithKey(
             lambda scope_node: VariableScope(scp_map=self,
                                              scope_node=scope_node))
+        self.frozen = False
+
+        # Memoized results of `find_parent_scope`, by identifier and then by
+        # starting scope node.
+        self._resolved = {}
+
+    def freeze(self):
+        """
+        Mark the map as complete. Any further attempt to create scopes,
+        identifiers or MemoryVariables raises, so that a frozen map can be
+        read from many threads at once.
+        """
+        self.frozen = True
+        self.memory.freeze()
 
     def get(self, scope_node) -> VariableScope:
         """
@@ -169,6 +201,9 @@ class VariableScopeMap:
         :return: The corresponding VariableScope object, or a new one if it
             doesn't exist.
         """
+        if self.frozen and scope_node not in self.scope_map:
+            raise KeyError("No scope exists for {} in a frozen map."
+                           .format(scope_node))
         return self.scope_map[scope_node]
 
     def get_from_name(self, name_node: ast.Name) -> VariableReference:
@@ -184,10 +219,30 @@ class VariableScopeMap:
         :param identifier: The identifier to search for.
         :return: The nearest ancestor that defines the identifier.
         """
+        resolved = self._resolved.setdefault(identifier, {})
         scope = starting_scope.scope_node
+        visited = []
         # We skip over class scopes, because they don't behave the normal way.
-        while scope and (isinstance(scope, ast.ClassDef) or
-                         identifier not in self.get(scope)):
+        # Scopes that were never created can't define anything, so they're
+        # checked without creating them.
+        while scope:
+            if scope in resolved:
+                scope = resolved[scope]
+                break
+            if (not isinstance(scope, ast.ClassDef) and
+                    identifier in self.scope_map.get(scope, ())):
+                break
+            visited.append(scope)
             # get the parent scope
             scope = scope.var_scope
+
+        # Every scope on the way resolves the identifier to the same place.
+        for node in visited:
+            resolved[node] = scope
         return self.get(scope)
+
+    def invalidate_resolution(self, identifier: str):
+        """
+        Forget the memoized scopes that `identifier` resolves to.
+        """
+        self._resolved.pop(identifier, None)
@@ -8,6 +8,9 @@ setuptools.setup(
     description="A dependency analyzer and tree-shaker to dump a specific class/function.",
     url="https://github.com/preyneyv/code-dumper",
     packages=setuptools.find_packages(),
+    entry_points={
+        'console_scripts': ['code-dumper=code_dumper.cli:main'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
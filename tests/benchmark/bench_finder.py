@@ -0,0 +1,59 @@
+"""
+Benchmark `NodeFinder` queries on large generated modules, comparing the
+type-indexed lookup against a plain `ast.walk` over every subtree.
+
+Usage: python bench_finder.py [size ...]
+"""
+import ast
+import sys
+import time
+
+from code_dumper import CodeDumper
+from code_dumper.finder import NodeFinder
+
+from corpus import generate_module
+
+
+def walk_find(root, nf_type, **properties):
+    for node in ast.walk(root):
+        if NodeFinder.matches(node, nf_type, **properties):
+            yield node
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def bench(size):
+    source = generate_module(size)
+    tree = ast.parse(source)
+    # Query every subtree, like `CodeDumper._calculate_node_dependencies`.
+    nodes = list(ast.walk(tree))
+
+    def query_walk():
+        return sum(1 for node in nodes
+                   for _ in walk_find(node, ast.Name, ctx=ast.Load))
+
+    def query_indexed():
+        finder = NodeFinder(tree)
+        return sum(1 for node in nodes
+                   for _ in finder.find(ast.Name, nf_root=node,
+                                        ctx=ast.Load))
+
+    t_walk, n_walk = timed(query_walk)
+    t_indexed, n_indexed = timed(query_indexed)
+    assert n_walk == n_indexed, (n_walk, n_indexed)
+    t_dumper, _ = timed(lambda: CodeDumper(source))
+
+    print('{:>6} lines | {:>6} nodes | walk {:8.3f}s | indexed {:8.3f}s | '
+          'x{:6.1f} | CodeDumper() {:8.3f}s'
+          .format(source.count('\n'), len(nodes), t_walk, t_indexed,
+                  t_walk / t_indexed, t_dumper))
+
+
+if __name__ == '__main__':
+    sizes = [int(s) for s in sys.argv[1:]] or [50, 200, 800]
+    for s in sizes:
+        bench(s)
@@ -0,0 +1,57 @@
+"""
+Generators for large, synthetic modules used by the benchmarks.
+"""
+
+FUNCTION_TEMPLATE = '''
+def func_{i}(a, b=CONST_{c}):
+    total = a
+    for x in range(b):
+        if x % 2:
+            total += helper_{h}(x)
+        else:
+            total = total * {i}
+    with open(PATH) as f:
+        data = f.read()
+    result = [v for v in data.split() if v]
+    cache['func_{i}'] = result
+    return total, os.path.join(PATH, str(len(result)))
+'''
+
+CLASS_TEMPLATE = '''
+class Class_{i}(Base_{b}):
+    attribute = CONST_{c}
+
+    def __init__(self, value):
+        self.value = value
+        self.items = []
+
+    def method(self, x):
+        self.items.append(func_{f}(x))
+        return self.value + helper_{h}(x)
+'''
+
+
+def generate_module(size: int) -> str:
+    """
+    Generate the source of a module with `size` functions and `size // 4`
+    classes, all referencing a shared set of globals.
+    :param size: The number of functions to generate.
+    :return: The generated source code.
+    """
+    n_consts = max(size // 10, 1)
+    n_helpers = max(size // 10, 1)
+    n_classes = max(size // 4, 1)
+    n_bases = max(n_classes // 10, 1)
+
+    parts = ['import os', 'import sys', "PATH = '/tmp'", 'cache = {}']
+    parts.extend('CONST_{0} = {0}'.format(i) for i in range(n_consts))
+    parts.extend('def helper_{0}(x):\n    return x + CONST_{1}'
+                 .format(i, i % n_consts) for i in range(n_helpers))
+    parts.extend('class Base_{}:\n    pass'.format(i) for i in range(n_bases))
+    parts.extend(FUNCTION_TEMPLATE.format(i=i, c=i % n_consts,
+                                          h=i % n_helpers)
+                 for i in range(size))
+    parts.extend(CLASS_TEMPLATE.format(i=i, b=i % n_bases, c=i % n_consts,
+                                       f=i % size, h=i % n_helpers)
+                 for i in range(n_classes))
+    return '\n'.join(parts) + '\n'
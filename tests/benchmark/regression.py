@@ -0,0 +1,217 @@
+"""
+Benchmark regression gate. Times every phase of `dump()` on the golden-file
+corpus in `tests/test_code_dump` and on generated modules, and compares the
+results against the committed baseline in `baseline.json`.
+
+Times are divided by the time of a fixed calibration loop, run right before
+each measurement, so the baseline holds up across machines and load. A phase
+fails the gate if it got slower than the baseline by more than the
+tolerance. The default tolerance leaves room for
+noise on shared machines, while anything that makes a phase scale worse
+shows up as a multiple on the larger generated modules.
+
+Usage: python regression.py [--tolerance 0.5] [--repeat 5] [--update]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+
+# Benchmark the checkout this file is in, whether or not it's installed.
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__)))))
+
+from code_dumper import CodeDumper
+from code_dumper.hooks import PhaseTimer
+
+from corpus import generate_module
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_DIR = os.path.join(os.path.dirname(HERE), 'test_code_dump')
+BASELINE_PATH = os.path.join(HERE, 'baseline.json')
+GENERATED_SIZES = (50, 200)
+GENERATED_DUMPS = 8
+
+
+def calibrate() -> float:
+    """
+    Time a fixed workload of plain interpreter operations (calls, attribute
+    access, dict and list operations).
+    """
+    class Node:
+        def __init__(self, value):
+            self.value = value
+            self.children = []
+
+    def run():
+        index = {}
+        nodes = [Node(i) for i in range(20000)]
+        for i, node in enumerate(nodes):
+            if i:
+                nodes[(i - 1) // 2].children.append(node)
+            index[node] = i
+        stack, total = [nodes[0]], 0
+        while stack:
+            node = stack.pop()
+            total += index[node] + node.value
+            stack.extend(node.children)
+        return total
+
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def golden_workload():
+    """
+    Get the module source and dumped name of every golden-file test case.
+    """
+    cases = []
+    script = os.path.join(GOLDEN_DIR, 'run_all_testcases.sh')
+    with open(script) as f:
+        for line in f:
+            match = re.match(r'python3? test\.py\s+(\S+)\s+(\S+)\s+(\S+)',
+                             line.strip())
+            if not match:
+                continue
+            directory, module, name = match.groups()
+            with open(os.path.join(GOLDEN_DIR, directory,
+                                   module + '.py')) as source:
+                cases.append((source.read(), name))
+    return cases
+
+
+def generated_workload(size: int):
+    """
+    Get a generated module, dumping an evenly spaced sample of its functions
+    and classes.
+    """
+    source = generate_module(size)
+    names = re.findall(r'^(?:def|class) (\w+)', source, re.M)
+    step = max(1, len(names) // GENERATED_DUMPS)
+    return [(source, name) for name in names[::step][:GENERATED_DUMPS]]
+
+
+def time_workload(cases, repeat: int) -> (dict, float):
+    """
+    Time every phase of analysing and dumping the cases, in calibration units.
+    Takes the median of `repeat` runs for each phase.
+    :return: The normalized phase times, and the fastest calibration.
+    """
+    runs = {}
+    best_calibration = float('inf')
+    for _ in range(repeat):
+        calibration = calibrate()
+        best_calibration = min(best_calibration, calibration)
+
+        timer = PhaseTimer()
+        analyses = {}
+        # Collections would land in whichever phase happens to trigger them.
+        gc.collect()
+        gc.disable()
+        try:
+            for source, name in cases:
+                if source not in analyses:
+                    analyses[source] = CodeDumper(source, hooks=[timer])
+                analyses[source].dump(name)
+        finally:
+            gc.enable()
+        for phase, total in timer.totals.items():
+            runs.setdefault(phase, []).append(total / calibration)
+    return ({phase: statistics.median(times) for phase, times in runs.items()},
+            best_calibration)
+
+
+def run(repeat: int) -> dict:
+    workloads = {'golden': golden_workload()}
+    for size in GENERATED_SIZES:
+        workloads['generated-{}'.format(size)] = generated_workload(size)
+
+    results = {}
+    calibration = float('inf')
+    for workload, cases in workloads.items():
+        phases, calibration_ = time_workload(cases, repeat)
+        calibration = min(calibration, calibration_)
+        for phase, units in phases.items():
+            results['{}/{}'.format(workload, phase)] = units
+    return {'calibration_s': calibration,
+            'python': platform.python_version(),
+            'phases': results}
+
+
+def compare(baseline: dict, current: dict, tolerance: float,
+            floor: float) -> list:
+    """
+    Compare normalized phase times against the baseline.
+    :param tolerance: The allowed slowdown, as a fraction of the baseline.
+    :param floor: Phases faster than this (in calibration units) in both runs
+        are too noisy to compare, and are skipped.
+    :return: A list of (phase, baseline, current, ratio) for the regressions.
+    """
+    regressions = []
+    for phase, before in sorted(baseline['phases'].items()):
+        after = current['phases'].get(phase)
+        if after is None:
+            print('{:<36} missing from this run'.format(phase))
+            continue
+        ratio = after / before
+        skipped = max(before, after) < floor
+        regressed = not skipped and ratio > 1 + tolerance
+        print('{:<36} {:9.3f} -> {:9.3f}  x{:5.2f}{}'.format(
+            phase, before, after, ratio,
+            '  (below floor)' if skipped else
+            '  REGRESSION' if regressed else ''))
+        if regressed:
+            regressions.append((phase, before, after, ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--baseline', default=BASELINE_PATH,
+                        help="The baseline JSON to compare against.")
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="Allowed slowdown per phase, as a fraction of "
+                             "the baseline (default: %(default)s).")
+    parser.add_argument('--floor', type=float, default=0.25,
+                        help="Skip phases that take less than this, in "
+                             "calibration units (default: %(default)s).")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="Runs per workload, the median counts "
+                             "(default: %(default)s).")
+    parser.add_argument('--update', action='store_true',
+                        help="Write this run as the new baseline.")
+    args = parser.parse_args(argv)
+
+    current = run(args.repeat)
+    print('Calibration: {:.2f} ms'.format(current['calibration_s'] * 1000))
+
+    if args.update:
+        with open(args.baseline, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print('Wrote baseline to {}'.format(args.baseline))
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('python') != current['python']:
+        print('Note: baseline is from Python {}, this is Python {}.'.format(
+            baseline.get('python'), current['python']))
+
+    regressions = compare(baseline, current, args.tolerance, args.floor)
+    if regressions:
+        print('{} phase(s) regressed by more than {:.0%}.'.format(
+            len(regressions), args.tolerance))
+        return 1
+    print('No regressions.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
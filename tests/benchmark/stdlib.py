@@ -0,0 +1,233 @@
+"""
+Throughput benchmark on the standard library. Dumps every top-level function
+and class of the local CPython stdlib modules, and reports the lines analysed
+per second, the time spent in every phase, the peak memory of a single
+module's analysis, and every failure.
+
+The corpus is whatever Python this runs on has installed, so results are
+comparable between runs on the same interpreter. Peak memory is measured
+with `tracemalloc`, which slows everything down. Pass `--no-memory` for
+timings only.
+
+Usage: python stdlib.py [--limit N] [--packages] [--dump-all] [--no-memory]
+                        [--timeout SECONDS] [--json PATH] [module ...]
+"""
+import argparse
+import ast
+import gc
+import json
+import os
+import platform
+import sys
+import sysconfig
+import time
+import tracemalloc
+from collections import Counter
+
+from code_dumper import Budget, CodeDumper, DumpCancelled
+from code_dumper.hooks import PhaseTimer
+
+_definition_nodes = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def find_modules(packages: bool = False) -> dict:
+    """
+    Find the stdlib modules' source files.
+    :param packages: Include the modules inside packages, except for tests.
+    :return: Module names mapped to their paths.
+    """
+    stdlib = sysconfig.get_paths()['stdlib']
+    modules = {}
+    for directory, subdirectories, files in os.walk(stdlib):
+        relative = os.path.relpath(directory, stdlib)
+        if relative != '.':
+            if not packages or 'site-packages' in relative or \
+                    relative.split(os.sep)[0] in ('test', 'idlelib'):
+                subdirectories[:] = []
+                continue
+        subdirectories.sort()
+        for file in sorted(files):
+            if not file.endswith('.py'):
+                continue
+            parts = [] if relative == '.' else relative.split(os.sep)
+            if file != '__init__.py':
+                parts.append(file[:-3])
+            modules['.'.join(parts)] = os.path.join(directory, file)
+    return modules
+
+
+def read_module(path: str) -> (str, list):
+    """
+    :return: The module's source, and the names of its top-level functions
+        and classes.
+    """
+    with open(path, 'rb') as f:
+        source = f.read().decode()
+    tree = ast.parse(source)
+    names = [node.name for node in tree.body
+             if isinstance(node, _definition_nodes)]
+    return source, names
+
+
+def run_module(source: str, names: list, timer: PhaseTimer,
+               dump_all: bool, timeout: float = None) -> list:
+    """
+    Analyse a module and dump every name.
+    :param timeout: Seconds the module's analysis and dumps may take in
+        total, after which the rest of them fail.
+    :return: A list of (name, error) for the failures. The name is None if
+        the analysis itself failed.
+    """
+    budget = None if timeout is None else Budget(timeout=timeout)
+    try:
+        dumper = CodeDumper(source, hooks=[timer], budget=budget)
+    except Exception as e:
+        return [(None, e)]
+    if dump_all:
+        try:
+            dumper.dump_all(names, budget)
+            return []
+        except DumpCancelled as e:
+            return [(name, e) for name in names]
+        except Exception:
+            # Find out which names fail.
+            pass
+
+    failures = []
+    for index, name in enumerate(names):
+        try:
+            dumper.dump(name, budget=budget)
+        except DumpCancelled as e:
+            failures.extend((name, e) for name in names[index:])
+            break
+        except Exception as e:
+            failures.append((name, e))
+    return failures
+
+
+def run(modules: dict, dump_all: bool, memory: bool,
+        timeout: float = None) -> dict:
+    timer = PhaseTimer()
+    results = {'modules': 0, 'lines': 0, 'names': 0, 'skipped': {},
+               'failures': [], 'slowest': [], 'peak_memory': {}}
+    total = 0.
+    for module, path in modules.items():
+        try:
+            source, names = read_module(path)
+        except (SyntaxError, UnicodeDecodeError, ValueError) as e:
+            results['skipped'][module] = repr(e)
+            continue
+
+        # Collections would land in whichever phase happens to trigger them.
+        gc.collect()
+        gc.disable()
+        if memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            failures = run_module(source, names, timer, dump_all, timeout)
+        finally:
+            elapsed = time.perf_counter() - start
+            if memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                results['peak_memory'][module] = peak
+            gc.enable()
+
+        total += elapsed
+        results['modules'] += 1
+        results['lines'] += source.count('\n') + 1
+        results['names'] += len(names)
+        results['slowest'].append((elapsed, module))
+        for name, error in failures:
+            results['failures'].append({
+                'module': module, 'name': name,
+                'error': '{}: {}'.format(type(error).__name__, error)})
+
+    results['slowest'] = [(module, elapsed) for elapsed, module in
+                          sorted(results['slowest'], reverse=True)[:10]]
+    results['seconds'] = total
+    results['phases'] = dict(timer.totals)
+    results['python'] = platform.python_version()
+    return results
+
+
+def report(results: dict):
+    seconds = results['seconds'] or float('inf')
+    print('Python {}: {} modules, {} lines, {} names in {:.2f} s'.format(
+        results['python'], results['modules'], results['lines'],
+        results['names'], results['seconds']))
+    print('{:.0f} lines/s, {:.1f} names/s'.format(
+        results['lines'] / seconds, results['names'] / seconds))
+
+    print('\nPhases:')
+    for phase, total in sorted(results['phases'].items(),
+                               key=lambda item: -item[1]):
+        print('  {:<12} {:8.2f} s  {:5.1%}'.format(phase, total,
+                                                   total / seconds))
+
+    print('\nSlowest modules:')
+    for module, elapsed in results['slowest']:
+        print('  {:<36} {:8.2f} s'.format(module, elapsed))
+
+    if results['peak_memory']:
+        print('\nPeak memory:')
+        peaks = sorted(results['peak_memory'].items(),
+                       key=lambda item: -item[1])
+        for module, peak in peaks[:10]:
+            print('  {:<36} {:8.1f} MB'.format(module, peak / 1e6))
+
+    failures = results['failures']
+    print('\n{} failure(s), {} module(s) skipped.'.format(
+        len(failures), len(results['skipped'])))
+    errors = Counter(failure['error'].split(':')[0] for failure in failures)
+    for error, count in errors.most_common():
+        example = next(failure for failure in failures
+                       if failure['error'].startswith(error + ':'))
+        print('  {:>5} x {}, e.g. {}.{}: {}'.format(
+            count, error, example['module'], example['name'] or '<module>',
+            example['error'][len(error) + 2:][:100]))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('modules', nargs='*',
+                        help="Only these modules (default: all of them).")
+    parser.add_argument('--limit', type=int,
+                        help="Only the first N modules, in name order.")
+    parser.add_argument('--packages', action='store_true',
+                        help="Include the modules inside packages, except "
+                             "for the tests.")
+    parser.add_argument('--dump-all', action='store_true',
+                        help="Resolve the names of each module together, "
+                             "with `CodeDumper.dump_all()`.")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="Don't measure the peak memory.")
+    parser.add_argument('--timeout', type=float,
+                        help="Seconds each module may take, after which its "
+                             "remaining names count as failures.")
+    parser.add_argument('--json',
+                        help="Also write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    modules = find_modules(args.packages or bool(args.modules))
+    if args.modules:
+        missing = set(args.modules) - set(modules)
+        if missing:
+            parser.error('Unknown module(s): {}'.format(
+                ', '.join(sorted(missing))))
+        modules = {module: modules[module] for module in args.modules}
+    if args.limit is not None:
+        modules = dict(sorted(modules.items())[:args.limit])
+
+    results = run(modules, args.dump_all, not args.no_memory, args.timeout)
+    report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
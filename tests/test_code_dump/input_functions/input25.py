@@ -0,0 +1,9 @@
+registry = {}
+
+
+def setter(key, value):
+    registry[key] = value
+
+
+def user(key):
+    return registry[key]
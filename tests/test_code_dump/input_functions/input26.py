@@ -0,0 +1,17 @@
+from os.path import (
+    basename,
+    join,
+    split,
+)
+
+
+def to_path(*parts):
+    return join(*parts)
+
+
+def to_name(path):
+    return basename(to_path(path))
+
+
+def unused():
+    return split('a/b')
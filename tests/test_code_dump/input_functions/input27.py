@@ -0,0 +1,15 @@
+import math
+
+RADIUS = 2
+
+
+def area(radius):
+    return math.pi * radius ** 2
+
+
+def circumference(radius):
+    return 2 * math.pi * radius
+
+
+def describe():
+    return 'area {:.2f}'.format(area(RADIUS))
@@ -0,0 +1,13 @@
+from collections import Counter
+
+
+def count_words(text):
+    return Counter(normalize(text).split())
+
+
+def normalize(text):
+    return text.lower().strip()
+
+
+def top_word(text):
+    return count_words(text).most_common(1)[0][0]
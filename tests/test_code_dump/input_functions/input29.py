@@ -0,0 +1,19 @@
+import math
+
+SCALE = 2
+
+
+def scale(x):
+    return x * SCALE
+
+
+def area(r):
+    return math.pi * scale(r) ** 2
+
+
+def perimeter(r):
+    return 2 * math.pi * scale(r)
+
+
+def unrelated():
+    return 'nothing'
@@ -0,0 +1,15 @@
+from functools import reduce
+
+OPERATORS = {'+': lambda a, b: a + b, '*': lambda a, b: a * b}
+
+
+def fold(op, values):
+    return reduce(OPERATORS[op], values)
+
+
+def fold_sum(values):
+    return fold('+', values)
+
+
+def fold_product(values):
+    return fold('*', values)
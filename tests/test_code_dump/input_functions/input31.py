@@ -0,0 +1,11 @@
+# Prices are in cents.
+TAX_RATE = 0.2
+
+
+def with_tax(price):
+    # Round down, like the till does.
+    return int(price * (1 + TAX_RATE))
+
+
+def discount(price):
+    return price // 2
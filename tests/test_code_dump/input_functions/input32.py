@@ -0,0 +1,18 @@
+import json
+import sqlite3
+from functools import wraps
+
+
+def logged(func):
+    @wraps(func)
+    def wrapper(*args):
+        print('Calling', func.__name__)
+        return func(*args)
+    return wrapper
+
+
+@logged
+def save(path, record):
+    connection = sqlite3.connect(path)
+    connection.execute('INSERT INTO records VALUES (?)', (json.dumps(record),))
+    connection.commit()
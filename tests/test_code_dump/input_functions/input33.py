@@ -0,0 +1,13 @@
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from decimal import Decimal
+
+Amount = Optional['Decimal']
+
+
+def total(prices: list, discount: Amount = None) -> 'Decimal':
+    result = sum(prices)
+    if discount:
+        result -= discount
+    return result
@@ -0,0 +1,25 @@
+import sys
+
+if sys.platform == 'win32':
+    SEPARATOR = '\\'
+    import ntpath as pathmodule
+else:
+    SEPARATOR = '/'
+    import posixpath as pathmodule
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+
+def split_path(path):
+    return path.split(SEPARATOR)
+
+
+def join_path(parts):
+    return pathmodule.join(*parts)
+
+
+def load(text):
+    return json.loads(text)
@@ -0,0 +1,13 @@
+import os.path, shutil
+from collections import Counter, OrderedDict, defaultdict as dd
+
+
+def backup(path):
+    shutil.copy(path, os.path.join(path + '.bak'))
+
+
+def tally(words):
+    counts = dd(int)
+    for word in words:
+        counts[word] += 1
+    return Counter(counts)
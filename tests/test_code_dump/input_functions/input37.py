@@ -0,0 +1,8 @@
+if __debug__:
+    MODE = 'debug'
+else: MODE = 'release'
+
+
+def parse(text):
+    try: return int(text)
+    finally: print(MODE, text)
@@ -0,0 +1,16 @@
+import csv
+import os
+import statistics
+
+
+def find_config():
+    return os.environ.get('REPORT_CONFIG', 'report.csv')
+
+
+CONFIG = find_config()
+
+
+def summarize():
+    with open(CONFIG) as f:
+        values = [float(row[0]) for row in csv.reader(f)]
+    return statistics.mean(values)
@@ -0,0 +1,15 @@
+import math
+
+RADIUS = 2.5
+
+
+def area(radius):
+    return math.pi * radius ** 2
+
+
+def circle_area():
+    return round(area(RADIUS), 2)
+
+
+def unrelated():
+    return RADIUS * 2
@@ -0,0 +1,16 @@
+from collections import Counter
+
+STOP_WORDS = {'a', 'an', 'the'}
+
+
+def words(text):
+    return [w for w in text.lower().split() if w not in STOP_WORDS]
+
+
+def most_common(text, n=3):
+    return Counter(words(text)).most_common(n)
+
+
+class Report:
+    def __init__(self, text):
+        self.top = most_common(text)
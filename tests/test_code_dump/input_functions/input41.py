@@ -0,0 +1,18 @@
+import json
+
+DEFAULTS = {'indent': 2}
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def merged(path):
+    config = dict(DEFAULTS)
+    config.update(load(path))
+    return config
+
+
+def unrelated():
+    return DEFAULTS
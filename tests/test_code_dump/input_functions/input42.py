@@ -0,0 +1,26 @@
+import os
+import re
+
+SEPARATOR = re.compile(r'[-_\s]+')
+
+
+def slug(text):
+    return SEPARATOR.sub('-', text.strip().lower())
+
+
+def is_hidden(path):
+    return os.path.basename(path).startswith('.')
+
+
+def page_name(path):
+    if is_hidden(path):
+        return None
+    return slug(os.path.splitext(os.path.basename(path))[0])
+
+
+def count(paths):
+    total = 0
+    for path in paths:
+        if page_name(path):
+            total += 1
+    return total
@@ -0,0 +1,41 @@
+#########################     INPUT     ##############################
+import csv
+import json
+
+
+class Report:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def to_json(self):
+        return json.dumps(self._records())
+
+    def to_csv(self, f):
+        writer = csv.writer(f)
+        writer.writerows(self.rows)
+
+    def _records(self):
+        return [dict(enumerate(row)) for row in self.rows]
+
+
+## Input Object to dump function : Report
+
+## Options : --methods to_json
+
+#########################     INPUT ENDS HERE     ##############################
+
+
+#########################     OUTPUT     ##############################
+import json
+
+
+class Report:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def to_json(self):
+        return json.dumps(self._records())
+
+    def _records(self):
+        return [dict(enumerate(row)) for row in self.rows]
+#########################     OUTPUT ENDS HERE     ##############################
@@ -0,0 +1,70 @@
+#########################     INPUT     ##############################
+import functools
+import time
+
+
+def timed(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            print(func.__name__, time.perf_counter() - start)
+    return wrapper
+
+
+class Inventory:
+    def __init__(self):
+        self.items = {}
+
+    @timed
+    def add(self, name, count=1):
+        self.items[name] = self.items.get(name, 0) + count
+
+    def total(self):
+        return sum(self.items.values())
+
+
+def restock(inventory, names):
+    for name in names:
+        inventory.add(name)
+    return inventory.total()
+
+
+## Input Object to dump function : Inventory
+
+## Options : --compact
+
+#########################     INPUT ENDS HERE     ##############################
+
+
+#########################     OUTPUT     ##############################
+import functools
+def timed(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            print(func.__name__, time.perf_counter() - start)
+    return wrapper
+
+
+class Inventory:
+    def __init__(self):
+        self.items = {}
+
+    @timed
+    def add(self, name, count=1):
+        self.items[name] = self.items.get(name, 0) + count
+
+    def total(self):
+        return sum(self.items.values())
+
+
+
+## Compacted : True
+## Same as before compact : True
+#########################     OUTPUT ENDS HERE     ##############################
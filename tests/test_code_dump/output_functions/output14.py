@@ -12,6 +12,4 @@ my_function(fname = "Ritanshu", lname = "Keshari")
 #########################     OUTPUT     ##############################
 def my_function(**kid):
   print("His last name is " + kid["lname"])
-
-my_function(fname = "Ritanshu", lname = "Keshari")
 #########################     OUTPUT ENDS HERE     ##############################
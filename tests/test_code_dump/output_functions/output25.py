@@ -0,0 +1,24 @@
+#########################     INPUT     ##############################
+registry = {}
+
+
+def setter(key, value):
+    registry[key] = value
+
+
+def user(key):
+    return registry[key]
+
+
+## Input Object to dump function : user
+
+#########################     INPUT ENDS HERE     ##############################
+
+
+#########################     OUTPUT     ##############################
+registry = {}
+
+
+def user(key):
+    return registry[key]
+#########################     OUTPUT ENDS HERE     ##############################
@@ -0,0 +1,42 @@
+#########################     INPUT     ##############################
+from os.path import (
+    basename,
+    join,
+    split,
+)
+
+
+def to_path(*parts):
+    return join(*parts)
+
+
+def to_name(path):
+    return basename(to_path(path))
+
+
+def unused():
+    return split('a/b')
+
+
+## Input Object to dump function : to_path
+
+## Options : --bundle to_name
+
+#########################     INPUT ENDS HERE     ##############################
+
+
+#########################     OUTPUT     ##############################
+from os.path import basename, join
+
+
+def to_path(*parts):
+    return join(*parts)
+
+
+def to_name(path):
+    return basename(to_path(path))
+
+
+
+## Exports : {'to_path': [4], 'to_name': [8]}
+#########################     OUTPUT ENDS HERE     ##############################
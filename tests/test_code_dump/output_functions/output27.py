@@ -0,0 +1,40 @@
+#########################     INPUT     ##############################
+import math
+
+RADIUS = 2
+
+
+def area(radius):
+    return math.pi * radius ** 2
+
+
+def circumference(radius):
+    return 2 * math.pi * radius
+
+
+def describe():
+    return 'area {:.2f}'.format(area(RADIUS))
+
+
+## Input Object to dump function : describe
+
+## Options : --timeout 0
+
+#########################     INPUT ENDS HERE     ##############################
+
+
+#########################     OUTPUT     ##############################
+## DumpTimeout : Ran past the deadline during the resolve phase.
+
+import math
+
+RADIUS = 2
+
+
+def area(radius):
+    return math.pi * radius ** 2
+
+
+def describe():
+    return 'area {:.2f}'.format(area(RADIUS))
+#########################     OUTPUT ENDS HERE     ##############################
@@ -0,0 +1,40 @@
+#########################     INPUT     ##############################
+from collections import Counter
+
+
+def count_words(text):
+    return Counter(normalize(text).split())
+
+
+def normalize(text):
+    return text.lower().strip()
+
+
+def top_word(text):
+    return count_words(text).most_common(1)[0][0]
+
+
+## Input Object to dump function : top_word
+
+## Options : --cancel
+
+#########################     INPUT ENDS HERE     ##############################
+
+
+#########################     OUTPUT     ##############################
+## DumpCancelled : Cancelled during the resolve phase.
+
+from collections import Counter
+
+
+def count_words(text):
+    return Counter(normalize(text).split())
+
+
+def normalize(text):
+    return text.lower().strip()
+
+
+def top_word(text):
+    return count_words(text).most_common(1)[0][0]
+#########################     OUTPUT ENDS HERE     ##############################
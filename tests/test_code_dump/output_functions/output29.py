@@ -0,0 +1,40 @@
+#########################     INPUT     ##############################
+import math
+
+SCALE = 2
+
+
+def scale(x):
+    return x * SCALE
+
+
+def area(r):
+    return math.pi * scale(r) ** 2
+
+
+def perimeter(r):
+    return 2 * math.pi * scale(r)
+
+
+def unrelated():
+    return 'nothing'
+
+
+## Input Object to dump function : scale
+
+## Options : --dependents
+
+#########################     INPUT ENDS HERE     ##############################
+
+
+#########################     OUTPUT     ##############################
+SCALE = 2
+
+
+def scale(x):
+    return x * SCALE
+
+
+
+## Dependents : ['area', 'perimeter', 'scale']
+#########################     OUTPUT ENDS HERE     ##############################
@@ -0,0 +1,44 @@
+#########################     INPUT     ##############################
+from functools import reduce
+
+OPERATORS = {'+': lambda a, b: a + b, '*': lambda a, b: a * b}
+
+
+def fold(op, values):
+    return reduce(OPERATORS[op], values)
+
+
+def fold_sum(values):
+    return fold('+', values)
+
+
+def fold_product(values):
+    return fold('*', values)
+
+
+## Input Object to dump function : fold_sum
+
+## Options : --compiled
+
+#########################     INPUT ENDS HERE     ##############################
+
+
+#########################     OUTPUT     ##############################
+from functools import reduce
+
+OPERATORS = {'+': lambda a, b: a + b, '*': lambda a, b: a * b}
+
+
+def fold(op, values):
+    return reduce(OPERATORS[op], values)
+
+
+def fold_sum(values):
+    return fold('+', values)
+
+
+
+## Digest matches : True
+## Cached : True
+## Defines fold_sum : True
+#########################     OUTPUT ENDS HERE     ##############################
@@ -0,0 +1,33 @@
+#########################     INPUT     ##############################
+# Prices are in cents.
+TAX_RATE = 0.2
+
+
+def with_tax(price):
+    # Round down, like the till does.
+    return int(price * (1 + TAX_RATE))
+
+
+def discount(price):
+    return price // 2
+
+
+## Input Object to dump function : with_tax
+
+## Options : --fingerprint
+
+#########################     INPUT ENDS HERE     ##############################
+
+
+#########################     OUTPUT     ##############################
+TAX_RATE = 0.2
+
+
+def with_tax(price):
+    # Round down, like the till does.
+    return int(price * (1 + TAX_RATE))
+
+
+
+## Fingerprint unchanged by comments and unrelated code : True
+#########################     OUTPUT ENDS HERE     ##############################
@@ -0,0 +1,51 @@
+#########################     INPUT     ##############################
+import json
+import sqlite3
+from functools import wraps
+
+
+def logged(func):
+    @wraps(func)
+    def wrapper(*args):
+        print('Calling', func.__name__)
+        return func(*args)
+    return wrapper
+
+
+@logged
+def save(path, record):
+    connection = sqlite3.connect(path)
+    connection.execute('INSERT INTO records VALUES (?)', (json.dumps(record),))
+    connection.commit()
+
+
+## Input Object to dump function : save
+
+## Options : --lazy
+
+#########################     INPUT ENDS HERE     ##############################
+
+
+#########################     OUTPUT     ##############################
+from functools import wraps
+
+
+def logged(func):
+    @wraps(func)
+    def wrapper(*args):
+        print('Calling', func.__name__)
+        return func(*args)
+    return wrapper
+
+
+@logged
+def save(path, record):
+    import json
+    import sqlite3
+    connection = sqlite3.connect(path)
+    connection.execute('INSERT INTO records VALUES (?)', (json.dumps(record),))
+    connection.commit()
+
+
+## Moved : {'json': ['save'], 'sqlite3': ['save']}
+#########################     OUTPUT ENDS HERE     ##############################
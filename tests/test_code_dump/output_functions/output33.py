@@ -0,0 +1,33 @@
+#########################     INPUT     ##############################
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from decimal import Decimal
+
+Amount = Optional['Decimal']
+
+
+def total(prices: list, discount: Amount = None) -> 'Decimal':
+    result = sum(prices)
+    if discount:
+        result -= discount
+    return result
+
+
+## Input Object to dump function : total
+
+## Options : --drop-annotations
+
+#########################     INPUT ENDS HERE     ##############################
+
+
+#########################     OUTPUT     ##############################
+## Starts with : from __future__ import annotations
+
+
+def total(prices: list, discount: Amount = None) -> 'Decimal':
+    result = sum(prices)
+    if discount:
+        result -= discount
+    return result
+#########################     OUTPUT ENDS HERE     ##############################
@@ -0,0 +1,31 @@
+#########################     INPUT     ##############################
+import os.path, shutil
+from collections import Counter, OrderedDict, defaultdict as dd
+
+
+def backup(path):
+    shutil.copy(path, os.path.join(path + '.bak'))
+
+
+def tally(words):
+    counts = dd(int)
+    for word in words:
+        counts[word] += 1
+    return Counter(counts)
+
+
+## Input Object to dump function : tally
+
+#########################     INPUT ENDS HERE     ##############################
+
+
+#########################     OUTPUT     ##############################
+from collections import Counter, defaultdict as dd
+
+
+def tally(words):
+    counts = dd(int)
+    for word in words:
+        counts[word] += 1
+    return Counter(counts)
+#########################     OUTPUT ENDS HERE     ##############################
@@ -0,0 +1,32 @@
+#########################     INPUT     ##############################
+import os
+
+
+def helper():
+    return os.getcwd()
+
+
+def configure(*, name, verbose=False):
+    return name, verbose
+
+
+def current():
+    return helper()
+
+
+## Input Object to dump function : current
+
+#########################     INPUT ENDS HERE     ##############################
+
+
+#########################     OUTPUT     ##############################
+import os
+
+
+def helper():
+    return os.getcwd()
+
+
+def current():
+    return helper()
+#########################     OUTPUT ENDS HERE     ##############################
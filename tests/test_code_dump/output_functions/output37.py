@@ -0,0 +1,28 @@
+#########################     INPUT     ##############################
+if __debug__:
+    MODE = 'debug'
+else: MODE = 'release'
+
+
+def parse(text):
+    try: return int(text)
+    finally: print(MODE, text)
+
+
+## Input Object to dump function : parse
+
+## Options : --statement-level
+
+#########################     INPUT ENDS HERE     ##############################
+
+
+#########################     OUTPUT     ##############################
+if __debug__:
+    MODE = 'debug'
+else: MODE = 'release'
+
+
+def parse(text):
+    try: return int(text)
+    finally: print(MODE, text)
+#########################     OUTPUT ENDS HERE     ##############################
@@ -0,0 +1,47 @@
+#########################     INPUT     ##############################
+import csv
+import os
+import statistics
+
+
+def find_config():
+    return os.environ.get('REPORT_CONFIG', 'report.csv')
+
+
+CONFIG = find_config()
+
+
+def summarize():
+    with open(CONFIG) as f:
+        values = [float(row[0]) for row in csv.reader(f)]
+    return statistics.mean(values)
+
+
+## Input Object to dump function : summarize
+
+## Options : --lazy
+
+#########################     INPUT ENDS HERE     ##############################
+
+
+#########################     OUTPUT     ##############################
+import os
+
+
+def find_config():
+    return os.environ.get('REPORT_CONFIG', 'report.csv')
+
+
+CONFIG = find_config()
+
+
+def summarize():
+    import csv
+    import statistics
+    with open(CONFIG) as f:
+        values = [float(row[0]) for row in csv.reader(f)]
+    return statistics.mean(values)
+
+
+## Moved : {'csv': ['summarize'], 'statistics': ['summarize']}
+#########################     OUTPUT ENDS HERE     ##############################
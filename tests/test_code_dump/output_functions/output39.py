@@ -0,0 +1,43 @@
+#########################     INPUT     ##############################
+import math
+
+RADIUS = 2.5
+
+
+def area(radius):
+    return math.pi * radius ** 2
+
+
+def circle_area():
+    return round(area(RADIUS), 2)
+
+
+def unrelated():
+    return RADIUS * 2
+
+
+## Input Object to dump function : circle_area
+
+## Options : --async
+
+#########################     INPUT ENDS HERE     ##############################
+
+
+#########################     OUTPUT     ##############################
+import math
+
+RADIUS = 2.5
+
+
+def area(radius):
+    return math.pi * radius ** 2
+
+
+def circle_area():
+    return round(area(RADIUS), 2)
+
+
+
+## Same as dump : True
+## Same as dump_many_async : True
+#########################     OUTPUT ENDS HERE     ##############################
@@ -0,0 +1,51 @@
+#########################     INPUT     ##############################
+import json
+
+DEFAULTS = {'indent': 2}
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def merged(path):
+    config = dict(DEFAULTS)
+    config.update(load(path))
+    return config
+
+
+def unrelated():
+    return DEFAULTS
+
+
+## Input Object to dump function : merged
+
+## Options : --trace
+
+#########################     INPUT ENDS HERE     ##############################
+
+
+#########################     OUTPUT     ##############################
+import json
+
+DEFAULTS = {'indent': 2}
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def merged(path):
+    config = dict(DEFAULTS)
+    config.update(load(path))
+    return config
+
+
+
+## Same as dump : True
+## Phases : ['ast', 'attributes', 'dependencies', 'parser', 'targets', 'resolve', 'emit']
+## Phases balanced : True
+## Loaded lines : [1, 3, 6, 11]
+#########################     OUTPUT ENDS HERE     ##############################
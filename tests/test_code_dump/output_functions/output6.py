@@ -17,6 +17,4 @@ x=8
 
 def func():
     print(x)
-
-func()
 #########################     OUTPUT ENDS HERE     ##############################
@@ -24,6 +24,26 @@ python3 test.py  input_classes input3 Derived3
 python3 test.py  input_classes input4 Derived1_Lvl2
 python3 test.py  input_classes input5 Employee
 python3 test.py  input_classes input6 Employee
+python3 test.py  input_functions input25 user
+python3 test.py  input_functions input26 to_path --bundle to_name
+python3 test.py  input_functions input27 describe --timeout 0
+python3 test.py  input_functions input28 top_word --cancel
+python3 test.py  input_functions input29 scale --dependents
+python3 test.py  input_classes input7 Report --methods to_json
+python3 test.py  input_functions input30 fold_sum --compiled
+python3 test.py  input_functions input31 with_tax --fingerprint
+python3 test.py  input_functions input32 save --lazy
+python3 test.py  input_functions input33 total --drop-annotations
+python3 test.py  input_functions input34 split_path --statement-level
+python3 test.py  input_functions input35 tally
+python3 test.py  input_functions input36 current
+python3 test.py  input_functions input37 parse --statement-level
+python3 test.py  input_functions input38 summarize --lazy
+python3 test.py  input_functions input39 circle_area --async
+python3 test.py  input_functions input40 most_common --daemon
+python3 test.py  input_functions input41 merged --trace
+python3 test.py  input_classes input8 Inventory --compact
+python3 test.py  input_functions input42 page_name --dump-all
 
 
 
@@ -1,8 +1,52 @@
-from code_dumper import dump
+from code_dumper import (Budget, CancellationToken, CodeDumper, DumpCancelled,
+                         dump, dump_async, dump_bundle, dump_compiled,
+                         dump_lazy, dump_many_async, load_compiled)
+from code_dumper.compiled import get_digest
+from code_dumper.helpers import get_source_from_obj
+from code_dumper.hooks import ChromeTraceHook
+import asyncio
+import contextlib
+import io
+import json
+import os
 import sys
+import tempfile
+import threading
 
 import_from_str = sys.argv[1]+'.'+sys.argv[2]
 import_import_str = sys.argv[3]
+# Options after the object to dump:
+#   --bundle NAME[,NAME...]  Bundle the object with these ones, and write the
+#                            export manifest after the source.
+#   --timeout SECONDS        Dump with a Budget of that many seconds, then
+#                            again without one from the same analysis.
+#   --cancel                 Dump with a cancelled Budget, then again without
+#                            one from the same analysis.
+#   --dependents             Write the names whose dumps include the object
+#                            after the source.
+#   --methods NAME[,NAME...] Only keep these entry methods of the class.
+#   --compiled               Dump with dump_compiled(), and check the digest,
+#                            the cache and that the code object runs.
+#   --fingerprint            Check that the fingerprint of the object doesn't
+#                            change with comments and unrelated code.
+#   --lazy                   Dump with dump_lazy(), and write the moved imports
+#                            after the source.
+#   --drop-annotations       Dump with drop_annotations=True. The __future__
+#                            import the dump starts with is written as a note,
+#                            since it can't be in the middle of this file.
+#   --statement-level        Dump with statement_level=True.
+#   --async                  Dump with dump_async(), and check it against
+#                            dump() and dump_many_async().
+#   --daemon                 Dump through the CLI from a DumpServer, and write
+#                            the names it lists after the source.
+#   --trace                  Dump with a ChromeTraceHook, and write the phases
+#                            and the loaded lines it recorded after the source.
+#   --compact                Dump after compact(), and check that every dump
+#                            of the module is the same as before it.
+#   --dump-all               Dump every name with dump_all(), check each dump
+#                            against dump(), and write the names after the
+#                            object's source.
+options = sys.argv[4:]
 #Please Change below path while running the testcases
 BASEPATH='/Users/ritanshukeshari/Desktop/razorsdk-code-dumper/tests/test_code_dump'
 
@@ -24,6 +68,8 @@ with open(output_file_path, "w") as f1:
 
     #INPUT_OBJECT_TO_DUMP
     ip_obj_str = '\n\n## Input Object to dump function : ' + sys.argv[3] + '\n\n'
+    if options:
+        ip_obj_str += '## Options : ' + ' '.join(options) + '\n\n'
     f1.write(ip_obj_str)
 
     ip_end_str = '#' * 25 + ' ' * 5 + 'INPUT ENDS HERE' + ' ' * 5 + '#' * 30 + '\n\n\n'
@@ -34,7 +80,90 @@ with open(output_file_path, "w") as f1:
     f1.write(op_str)
 
     try:
-        output_str = dump(klass)
+        if '--bundle' in options:
+            names = options[options.index('--bundle') + 1].split(',')
+            bundle = dump_bundle([klass] + [getattr(mod, name) for name in names])
+            output_str = bundle.source + '\n\n## Exports : ' + str(bundle.exports) + '\n'
+        elif '--timeout' in options or '--cancel' in options:
+            if '--timeout' in options:
+                budget = Budget(timeout=float(options[options.index('--timeout') + 1]))
+            else:
+                token = CancellationToken()
+                token.cancel()
+                budget = Budget(token=token)
+            dumper = CodeDumper(get_source_from_obj(klass))
+            try:
+                output_str = dumper.dump(import_import_str, budget=budget)
+            except DumpCancelled as e:
+                output_str = '## ' + type(e).__name__ + ' : ' + str(e) + '\n\n' + dumper.dump(import_import_str)
+        elif '--methods' in options:
+            methods = options[options.index('--methods') + 1].split(',')
+            output_str = dump(klass, methods=methods)
+        elif '--compiled' in options:
+            compiled = dump_compiled(klass)
+            namespace = {}
+            exec(load_compiled(compiled), namespace)
+            output_str = compiled.source + '\n\n## Digest matches : ' + str(compiled.digest == get_digest(compiled.source)) + '\n## Cached : ' + str(dump_compiled(klass) is compiled) + '\n## Defines ' + import_import_str + ' : ' + str(import_import_str in namespace) + '\n'
+        elif '--fingerprint' in options:
+            source = get_source_from_obj(klass)
+            edited = '# A new comment.\n\n\n' + source + '\n\ndef unrelated():\n    return None\n'
+            fingerprint = CodeDumper(source).fingerprint(import_import_str)
+            output_str = dump(klass) + '\n\n## Fingerprint unchanged by comments and unrelated code : ' + str(CodeDumper(edited).fingerprint(import_import_str) == fingerprint) + '\n'
+        elif '--lazy' in options:
+            lazy = dump_lazy(klass)
+            output_str = lazy.source + '\n\n## Moved : ' + str(lazy.moved) + '\n'
+        elif '--drop-annotations' in options:
+            output_str = dump(klass, drop_annotations=True)
+            future = 'from __future__ import annotations\n'
+            if output_str.startswith(future):
+                output_str = '## Starts with : ' + future + output_str[len(future):]
+        elif '--statement-level' in options:
+            output_str = dump(klass, statement_level=True)
+        elif '--async' in options:
+            async def dump_both():
+                return await dump_async(klass), await dump_many_async([klass, klass])
+            single, many = asyncio.run(dump_both())
+            output_str = single + '\n\n## Same as dump : ' + str(single == dump(klass)) + '\n## Same as dump_many_async : ' + str(many == [single, single]) + '\n'
+        elif '--daemon' in options:
+            # Unix domain sockets only, like the daemon.
+            from code_dumper.cli import main as cli_main
+            from code_dumper.server import DumpServer
+            socket_path = os.path.join(tempfile.mkdtemp(), 'dumper.sock')
+            server = DumpServer(socket_path)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            try:
+                outputs = []
+                for command in (['dump', input_file_path, import_import_str], ['names', input_file_path]):
+                    with contextlib.redirect_stdout(io.StringIO()) as out:
+                        cli_main(['--socket', socket_path] + command)
+                    outputs.append(out.getvalue())
+            finally:
+                server.shutdown()
+                server.server_close()
+            output_str = outputs[0] + '\n## Same as dump : ' + str(outputs[0] == dump(klass) + '\n') + '\n## Names : ' + str(outputs[1].split()) + '\n'
+        elif '--trace' in options:
+            trace = ChromeTraceHook()
+            output_str = CodeDumper(get_source_from_obj(klass), hooks=[trace]).dump(import_import_str)
+            events = json.loads(json.dumps(trace.to_json()))['traceEvents']
+            phases = [e['name'] for e in events if e['ph'] == 'B']
+            balanced = phases == [e['name'] for e in events if e['ph'] == 'E']
+            loaded = sorted({e['args']['lineno'] for e in events if e['cat'] == 'load' and 'lineno' in e['args']})
+            output_str += '\n\n## Same as dump : ' + str(output_str == dump(klass)) + '\n## Phases : ' + str(phases) + '\n## Phases balanced : ' + str(balanced) + '\n## Loaded lines : ' + str(loaded) + '\n'
+        elif '--compact' in options:
+            dumper = CodeDumper(get_source_from_obj(klass))
+            before = dumper.dump_all()
+            lazy_before = dumper.dump_lazy(import_import_str).source
+            dumper.compact()
+            output_str = dumper.dump(import_import_str) + '\n\n## Compacted : ' + str(dumper.compacted) + '\n## Same as before compact : ' + str(dumper.dump_all() == before and dumper.dump_lazy(import_import_str).source == lazy_before) + '\n'
+        elif '--dump-all' in options:
+            dumper = CodeDumper(get_source_from_obj(klass))
+            dumps = dumper.dump_all()
+            output_str = dumps[import_import_str] + '\n\n## Names : ' + str(list(dumps)) + '\n## Same as dump : ' + str(all(dumps[name] == dumper.dump(name) for name in dumps)) + '\n## Same as dump_all of the name : ' + str(dumper.dump_all([import_import_str]) == {import_import_str: dumps[import_import_str]}) + '\n'
+        elif '--dependents' in options:
+            dumper = CodeDumper(get_source_from_obj(klass))
+            output_str = dumper.dump(import_import_str) + '\n\n## Dependents : ' + str(sorted(dumper.get_dependents(import_import_str))) + '\n'
+        else:
+            output_str = dump(klass)
         f1.write(output_str)
     except:
         f1.write('\n\n ## Please check dump function not able to handle above code ## \n\n')